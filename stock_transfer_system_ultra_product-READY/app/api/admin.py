@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Request, Form, Depends
-from fastapi.responses import RedirectResponse, HTMLResponse
+from fastapi import APIRouter, Request, Form, Depends, HTTPException
+from fastapi.responses import RedirectResponse, HTMLResponse, FileResponse
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
+from datetime import datetime
 from fastapi.templating import Jinja2Templates
 
-from app.api.deps import get_db, require_role
+from app.api.deps import get_db, get_read_db, require_role
+from app.models.audit import AuditLog
 from app.models.user import User, Organization
 from app.core.security import hash_password
+from app.core.profiling import list_reports, report_path
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -50,3 +54,55 @@ def org_page(
 ):
     org = db.query(Organization).filter_by(id=user.org_id).first()
     return templates.TemplateResponse("admin_org.html", {"request": request, "org": org})
+
+
+@router.get("/admin/profiles", response_class=HTMLResponse)
+def profiles_page(
+    request: Request,
+    user: User = Depends(require_role(["Admin"]))
+):
+    return templates.TemplateResponse("admin_profiles.html", {"request": request, "reports": list_reports()})
+
+
+@router.get("/admin/profiles/{name}.{ext}")
+def profile_report(
+    name: str,
+    ext: str,
+    user: User = Depends(require_role(["Admin"]))
+):
+    path = report_path(name, ext)
+    if not path:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{name}.{ext}")
+
+
+@router.get("/admin/audit", response_class=HTMLResponse)
+def audit_page(
+    request: Request,
+    before: str = "",
+    action: str = "",
+    email: str = "",
+    limit: int = 100,
+    db: Session = Depends(get_read_db),
+    user: User = Depends(require_role(["Admin"]))
+):
+    limit = max(1, min(limit, 500))
+    q = db.query(AuditLog).filter(AuditLog.org_id == user.org_id)
+    if action:
+        q = q.filter(AuditLog.action.startswith(action))
+    if email:
+        q = q.filter(AuditLog.user_email == email)
+    # keyset cursor "<created_at>_<id>", newest first; served by ix_audit_logs_org_id_created_at
+    if before:
+        try:
+            ts, _, last_id = before.rpartition("_")
+            ts, last_id = datetime.fromisoformat(ts), int(last_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        q = q.filter(or_(AuditLog.created_at < ts, and_(AuditLog.created_at == ts, AuditLog.id < last_id)))
+    rows = q.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1).all()
+    next_before = f"{rows[limit - 1].created_at.isoformat()}_{rows[limit - 1].id}" if len(rows) > limit else None
+    return templates.TemplateResponse("admin_audit.html", {
+        "request": request, "rows": rows[:limit], "before": before, "next_before": next_before,
+        "action": action, "email": email, "limit": limit
+    })
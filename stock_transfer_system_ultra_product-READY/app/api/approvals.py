@@ -3,22 +3,29 @@ from fastapi.responses import RedirectResponse, HTMLResponse
 from sqlalchemy.orm import Session
 from fastapi.templating import Jinja2Templates
 
-from app.api.deps import get_db, current_user
+from app.api.deps import get_db, get_read_db, current_user
 from app.models.plan import TransferPlan
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/approvals", response_class=HTMLResponse)
-def approvals_page(request: Request, db: Session = Depends(get_db)):
+def approvals_page(request: Request, before: int | None = None, limit: int = 50,
+                   db: Session = Depends(get_db), rdb: Session = Depends(get_read_db)):
+    from app.services.plan_store import plan_summaries
     user = current_user(request, db)
     if not user:
         return RedirectResponse("/login", status_code=302)
+    limit = max(1, min(limit, 200))
 
-    plans = (
-        db.query(TransferPlan)
-        .filter(TransferPlan.org_id == user.org_id)
-        .order_by(TransferPlan.id.desc())
-        .all()
-    )
-    return templates.TemplateResponse("approvals.html", {"request": request, "plans": plans})
+    # keyset pagination, newest first: the next page starts below the last id shown
+    q = rdb.query(TransferPlan).filter(TransferPlan.org_id == user.org_id)
+    if before:
+        q = q.filter(TransferPlan.id < before)
+    plans = q.order_by(TransferPlan.id.desc()).limit(limit + 1).all()
+    next_before = plans[limit - 1].id if len(plans) > limit else None
+    plans = plans[:limit]
+    return templates.TemplateResponse("approvals.html", {
+        "request": request, "plans": plans, "summaries": plan_summaries(rdb, plans),
+        "before": before, "next_before": next_before, "limit": limit
+    })
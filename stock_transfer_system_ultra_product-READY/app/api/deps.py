@@ -1,8 +1,13 @@
 from fastapi import Request, HTTPException, Depends
 from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
+import time
+from app.core.config import settings
+from app.core.metrics import registry
+from app.db.session import SessionLocal, ReadSessionLocal, read_engine, engine
 from app.models.user import User
 
+READ_SESSIONS = registry.counter("db_read_sessions_total", "Read-path sessions by target database", ("target",))
+
 # DB Session
 def get_db():
     db = SessionLocal()
@@ -11,6 +16,20 @@ def get_db():
     finally:
         db.close()
 
+# Read-only DB Session: the replica, except for a session that wrote recently
+def get_read_db(request: Request):
+    primary = read_engine is engine or request.session.get("rw_until", 0) > time.time()
+    READ_SESSIONS.inc(target="primary" if primary else "replica")
+    db = SessionLocal() if primary else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Call after a write so this session reads the primary until the replica catches up
+def mark_write(request: Request):
+    request.session["rw_until"] = time.time() + settings.READ_YOUR_WRITES_SECONDS
+
 # Get current user from session
 def current_user(request: Request, db: Session = Depends(get_db)):
     email = request.session.get("user_email")
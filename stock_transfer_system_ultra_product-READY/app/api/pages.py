@@ -3,9 +3,8 @@ from fastapi.responses import RedirectResponse, HTMLResponse
 from sqlalchemy.orm import Session
 from fastapi.templating import Jinja2Templates
 from datetime import datetime
-import pandas as pd
 from sqlalchemy import inspect
-from app.api.deps import get_db, current_user
+from app.api.deps import get_db, get_read_db, current_user
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -23,12 +22,13 @@ def t(lang, key):
     return d.get(key, key)
 
 @router.get("/", response_class=HTMLResponse)
-def home(request: Request, lang: str = "en", db: Session = Depends(get_db)):
+def home(request: Request, lang: str = "en", db: Session = Depends(get_db), rdb: Session = Depends(get_read_db)):
     user = current_user(request, db)
     if not user:
         return RedirectResponse("/login", status_code=302)
 
-    engine = db.get_bind()
+    import pandas as pd
+    engine = rdb.get_bind()
     insp = inspect(engine)
 
     def exists(name):
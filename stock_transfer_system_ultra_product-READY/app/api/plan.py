@@ -1,72 +1,98 @@
-from fastapi import APIRouter, Request, Depends
-from fastapi.responses import RedirectResponse, HTMLResponse, StreamingResponse
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import RedirectResponse, HTMLResponse, StreamingResponse, FileResponse
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from fastapi.templating import Jinja2Templates
-from datetime import datetime
-import os, pandas as pd, io
+import io, time
 
-from app.api.deps import get_db, require_role
-from app.models.inventory import Sale, Stock, Store, Rules, Item
+from app.api.deps import get_db, get_read_db, mark_write, require_role
 from app.models.plan import TransferPlan, TransferItem, PlanComment
 from app.models.user import User
-from app.services.planner import compute_velocity, plan_transfers
+from app.core.config import settings
+from app.core.metrics import stage_timer, observe_stage
+from app.services.notify import notify_slack
+from app.services.audit import audit
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
-EXPORTS_DIR = "exports"
+PAGE_PREVIEW_ROWS = 500  # the full plan is on /plan/{id} and /api/plans/{id}/items
 
 @router.get("/plan", response_class=HTMLResponse)
 def plan_page(
     request: Request,
     lookback: int = 7,
+    base: int | None = None,
+    incremental: bool = False,
+    method: str = "velocity",
     db: Session = Depends(get_db),
+    rdb: Session = Depends(get_read_db),
     user: User = Depends(require_role(["Admin", "Planner", "Approver", "StoreManager", "Viewer"]))
 ):
-    sales = pd.read_sql(db.query(Sale).filter(Sale.org_id == user.org_id).statement, db.bind)
-    stock = pd.read_sql(db.query(Stock).filter(Stock.org_id == user.org_id).statement, db.bind)
-    stores = pd.read_sql(db.query(Store).filter(Store.org_id == user.org_id).statement, db.bind)
-    items = pd.read_sql(db.query(Item).filter(Item.org_id == user.org_id).statement, db.bind)
-
-    rules_obj = db.query(Rules).filter(Rules.org_id == user.org_id).first()
-    rules = {
-        "target_days_cover": rules_obj.target_days_cover if rules_obj else 7,
-        "min_display": rules_obj.min_display if rules_obj else 1,
-        "pack_size": rules_obj.pack_size if rules_obj else 1
-    }
-
-    vel = compute_velocity(sales, lookback_days=lookback)
-    plan_df, pick, recv, kpi = plan_transfers(stock, vel, stores, rules)
+    # pandas/planner load on first use so workers start without them
+    from app.services.planner import compute_velocity, plan_transfers, plan_incremental, group_digests, KPI_COLS
+    from app.services.plan_store import save_plan_rows, load_plan_rows, plan_summary, content_hash, org_rules
+    from app.services.snapshots import load_planner_inputs
+
+    # older sales may have been compacted into weekly totals, so a longer window would read short
+    if not 1 <= lookback <= settings.MAX_LOOKBACK_DAYS:
+        raise HTTPException(status_code=400,
+                            detail=f"lookback must be between 1 and {settings.MAX_LOOKBACK_DAYS} days")
+
+    # incremental mode: ?base=<plan id>, or ?incremental=1 for the org's latest plan
+    base_plan = None
+    if base or incremental:
+        q = db.query(TransferPlan).filter(TransferPlan.org_id == user.org_id)
+        base_plan = q.filter(TransferPlan.id == base).first() if base else q.order_by(TransferPlan.id.desc()).first()
+
+    t_load = time.perf_counter()
+    sales, stock, stores, source = load_planner_inputs(rdb, user.org_id)
+    observe_stage(f"{source}_load", t_load)
+    rules = org_rules(rdb, user.org_id)
+
+    forecast = None
+    if method == "forecast":
+        from app.services.forecast import forecast_velocity
+        with stage_timer("forecast"):
+            vel, forecast = forecast_velocity(sales, horizon=rules["target_days_cover"] or 7)
+    else:
+        with stage_timer("velocity"):
+            vel = compute_velocity(sales, lookback_days=lookback)
+    if base_plan:
+        with stage_timer("load_base"):
+            base_groups, base_items, base_kpis = load_plan_rows(db, base_plan.id)
+        plan_df, pick, recv, kpi, groups, reused, recomputed = plan_incremental(
+            stock, vel, stores, rules, base_groups, base_items, base_kpis)
+    else:
+        plan_df, pick, recv, kpi = plan_transfers(stock, vel, stores, rules)
+        kpi = kpi[KPI_COLS]
+        with stage_timer("digest"):
+            groups = group_digests(stock, vel, stores, rules)
+        reused, recomputed = 0, len(groups)
 
     # save plan
-    plan = TransferPlan(org_id=user.org_id, created_by=user.id, status="Draft", lookback_days=lookback)
-    db.add(plan)
-    db.commit()
-    db.refresh(plan)
-    for _, r in plan_df.iterrows():
-        db.add(TransferItem(plan_id=plan.id, **r.to_dict()))
-    db.commit()
-
-    # export excel
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    export_name = f"Plan_{plan.id}_{ts}.xlsx"
-    os.makedirs(EXPORTS_DIR, exist_ok=True)
-    with pd.ExcelWriter(os.path.join(EXPORTS_DIR, export_name)) as writer:
-        sales.to_excel(writer, index=False, sheet_name="Sales")
-        stock.to_excel(writer, index=False, sheet_name="Stock")
-        items.to_excel(writer, index=False, sheet_name="Items")
-        stores.to_excel(writer, index=False, sheet_name="Stores")
-        pd.DataFrame([rules]).to_excel(writer, index=False, sheet_name="Rules")
-        plan_df.to_excel(writer, index=False, sheet_name="Transfer Plan")
-        pick.to_excel(writer, index=False, sheet_name="Pick List")
-        recv.to_excel(writer, index=False, sheet_name="Receive List")
-        kpi.to_excel(writer, index=False, sheet_name="KPIs")
+    with stage_timer("persist"):
+        plan = TransferPlan(org_id=user.org_id, created_by=user.id, status="Draft", lookback_days=lookback,
+                            base_plan_id=base_plan.id if base_plan else None,
+                            groups_reused=reused, groups_recomputed=recomputed, **rules,
+                            content_hash=content_hash(plan_df, kpi), **plan_summary(plan_df))
+        db.add(plan)
+        db.flush()
+        save_plan_rows(db, plan.id, plan_df, kpi, groups)
+        db.commit()
+    mark_write(request)
+    audit(user, "plan.create", f"plan {plan.id}: {len(plan_df)} lines, lookback {lookback}, {method}"
+          + (f", incremental from {base_plan.id}" if base_plan else ""))
 
     # charts data
     k_head = kpi.head(20).to_dict(orient="records")
     return templates.TemplateResponse("plan.html", {
-        "request": request, "plan": plan_df.to_dict(orient="records"),
-        "kpis": k_head, "lookback": lookback,
-        "export_path": f"/exports/{export_name}",
+        "request": request, "plan": plan_df.head(PAGE_PREVIEW_ROWS).to_dict(orient="records"),
+        "method": method, "forecast": forecast,
+        "plan_lines": len(plan_df),
+        "kpis": k_head, "lookback": lookback, "max_lookback": settings.MAX_LOOKBACK_DAYS,
+        "plan_id": plan.id,
+        "base_plan_id": plan.base_plan_id, "groups_reused": reused, "groups_recomputed": recomputed,
+        "export_path": f"/plan/{plan.id}/export.xlsx",
         "csv_pick": f"/plan/{plan.id}/pick.csv",
         "csv_recv": f"/plan/{plan.id}/receive.csv"
     })
@@ -76,17 +102,51 @@ def plan_page(
 def plan_detail(
     request: Request,
     plan_id: int,
-    db: Session = Depends(get_db),
+    after: int = 0,
+    store: str = "",
+    sku: str = "",
+    limit: int = 100,
+    db: Session = Depends(get_read_db),
     user: User = Depends(require_role(["Admin", "Planner", "Approver", "StoreManager", "Viewer"]))
 ):
+    from app.services.plan_store import plan_summaries
     plan = db.query(TransferPlan).filter_by(id=plan_id, org_id=user.org_id).first()
-    items = db.query(TransferItem).filter_by(plan_id=plan_id).all()
-    comments = db.query(PlanComment).filter(PlanComment.plan_id == plan_id).all()
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    limit = max(1, min(limit, 500))
+
+    # keyset pagination on TransferItem.id, one extra row tells us if there is a next page
+    q = db.query(TransferItem).filter(TransferItem.plan_id == plan_id, TransferItem.id > after)
+    if store:
+        q = q.filter(or_(TransferItem.from_store_id == store, TransferItem.to_store_id == store))
+    if sku:
+        q = q.filter(TransferItem.sku.startswith(sku))
+    items = q.order_by(TransferItem.id).limit(limit + 1).all()
+    next_after = items[limit - 1].id if len(items) > limit else None
+
+    comments = (db.query(PlanComment).filter(PlanComment.plan_id == plan_id)
+                .order_by(PlanComment.id.desc()).limit(50).all())[::-1]
     return templates.TemplateResponse("transfer_detail.html", {
-        "request": request, "plan": plan, "items": items, "comments": comments
+        "request": request, "plan": plan, "items": items[:limit], "comments": comments,
+        "summary": plan_summaries(db, [plan])[plan.id],
+        "store": store, "sku": sku, "limit": limit, "after": after, "next_after": next_after
     })
 
 
+@router.get("/plan/{plan_id}/export.xlsx")
+def plan_export(
+    plan_id: int,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_role(["Admin", "Planner", "Approver", "StoreManager", "Viewer"]))
+):
+    from app.services.exports import get_export
+    plan = db.query(TransferPlan).filter_by(id=plan_id, org_id=user.org_id).first()
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return FileResponse(get_export(db, plan), filename=f"Plan_{plan_id}.xlsx",
+                        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
 @router.post("/plan/{plan_id}/comment")
 def add_comment(
     request: Request,
@@ -105,11 +165,13 @@ def add_comment(
         comment_text = asyncio.get_event_loop().run_until_complete(read_form())
     db.add(PlanComment(plan_id=plan_id, user_email=user.email, comment=comment_text))
     db.commit()
+    mark_write(request)
     return RedirectResponse(f"/plan/{plan_id}", status_code=302)
 
 
 @router.post("/plan/{plan_id}/submit")
 def submit_plan(
+    request: Request,
     plan_id: int,
     db: Session = Depends(get_db),
     user: User = Depends(require_role(["Admin", "Planner"]))
@@ -117,11 +179,15 @@ def submit_plan(
     plan = db.query(TransferPlan).filter_by(id=plan_id, org_id=user.org_id).first()
     plan.status = "Submitted"
     db.commit()
+    mark_write(request)
+    notify_slack(f"Plan #{plan_id} submitted by {user.email}")
+    audit(user, "plan.submit", f"plan {plan_id}")
     return RedirectResponse(f"/plan/{plan_id}", status_code=302)
 
 
 @router.post("/plan/{plan_id}/approve")
 def approve_plan(
+    request: Request,
     plan_id: int,
     db: Session = Depends(get_db),
     user: User = Depends(require_role(["Admin", "Approver"]))
@@ -129,11 +195,15 @@ def approve_plan(
     plan = db.query(TransferPlan).filter_by(id=plan_id, org_id=user.org_id).first()
     plan.status = "Approved"
     db.commit()
+    mark_write(request)
+    notify_slack(f"Plan #{plan_id} approved by {user.email}")
+    audit(user, "plan.approve", f"plan {plan_id}")
     return RedirectResponse(f"/plan/{plan_id}", status_code=302)
 
 
 @router.post("/plan/{plan_id}/reject")
 def reject_plan(
+    request: Request,
     plan_id: int,
     db: Session = Depends(get_db),
     user: User = Depends(require_role(["Admin", "Approver"]))
@@ -141,11 +211,15 @@ def reject_plan(
     plan = db.query(TransferPlan).filter_by(id=plan_id, org_id=user.org_id).first()
     plan.status = "Rejected"
     db.commit()
+    mark_write(request)
+    notify_slack(f"Plan #{plan_id} rejected by {user.email}")
+    audit(user, "plan.reject", f"plan {plan_id}")
     return RedirectResponse(f"/plan/{plan_id}", status_code=302)
 
 
 @router.get("/plan/{plan_id}/pick.csv")
-def csv_pick(plan_id: int, db: Session = Depends(get_db)):
+def csv_pick(plan_id: int, db: Session = Depends(get_read_db)):
+    import pandas as pd
     items = pd.read_sql(db.query(TransferItem).filter(TransferItem.plan_id == plan_id).statement, db.bind)
     if items.empty:
         content = "from_store_id,from_store,sku,style,size,qty\n"
@@ -158,7 +232,8 @@ def csv_pick(plan_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/plan/{plan_id}/receive.csv")
-def csv_recv(plan_id: int, db: Session = Depends(get_db)):
+def csv_recv(plan_id: int, db: Session = Depends(get_read_db)):
+    import pandas as pd
     items = pd.read_sql(db.query(TransferItem).filter(TransferItem.plan_id == plan_id).statement, db.bind)
     if items.empty:
         content = "to_store_id,to_store,sku,style,size,qty\n"
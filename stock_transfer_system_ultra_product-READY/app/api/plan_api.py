@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import gzip, hashlib, json
+
+from app.api.deps import get_read_db, require_role
+from app.models.plan import TransferPlan, TransferItem, PlanKpi
+from app.models.user import User
+
+router = APIRouter()
+
+ITEM_FIELDS = ["from_store_id", "from_store", "to_store_id", "to_store", "sku", "style", "size", "qty"]
+KPI_FIELDS = ["store_id", "store_name", "sku", "style", "size", "avg_daily_sales",
+              "on_hand_before", "on_hand_after", "days_cover_before", "days_cover_after"]
+GZIP_MIN_BYTES = 1024
+MAX_LIMIT = 5000
+
+
+def _etag(plan: TransferPlan, kind: str, fields, after: int, limit: int, gzipped: bool) -> str:
+    # plan rows never change after save, so the stored content hash pins every page of them
+    base = plan.content_hash or f"plan-{plan.id}"
+    tag = hashlib.sha256(f"{base}|{kind}|{','.join(fields)}|{after}|{limit}".encode()).hexdigest()[:32]
+    return f'"{tag}{"-gz" if gzipped else ""}"'
+
+
+def _columnar(request: Request, db: Session, user: User, plan_id: int, model, kind: str,
+              allowed, fields: str, after: int, limit: int):
+    plan = db.query(TransferPlan).filter_by(id=plan_id, org_id=user.org_id).first()
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    cols = [f for f in fields.split(",") if f] if fields else list(allowed)
+    unknown = [f for f in cols if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    gzipped = "gzip" in request.headers.get("accept-encoding", "")
+    etag = _etag(plan, kind, cols, after, limit, gzipped)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding, Cookie"}
+    # either encoding's tag is a valid cached copy for the client that holds it
+    sent = [t.strip() for t in request.headers.get("if-none-match", "").split(",")]
+    for candidate in (etag, _etag(plan, kind, cols, after, limit, False)):
+        if "*" in sent or candidate in sent:
+            return Response(status_code=304, headers={**headers, "ETag": candidate})
+
+    rows = db.execute(
+        select(model.id, *[getattr(model, c) for c in cols])
+        .where(model.plan_id == plan_id, model.id > after)
+        .order_by(model.id).limit(limit + 1)
+    ).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    columns = ["id"] + cols
+    data = {c: list(v) for c, v in zip(columns, zip(*rows))} if rows else {c: [] for c in columns}
+    body = json.dumps({
+        "plan_id": plan_id, "columns": columns, "count": len(rows), "data": data,
+        "next_cursor": rows[-1][0] if more else None,
+    }, separators=(",", ":"), default=str).encode()
+
+    if gzipped and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    elif gzipped:
+        # too small to compress: identity body, identity ETag
+        headers["ETag"] = _etag(plan, kind, cols, after, limit, False)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@router.get("/api/plans/{plan_id}/items")
+def plan_items_api(
+    request: Request,
+    plan_id: int,
+    after: int = 0,
+    limit: int = 1000,
+    fields: str = "",
+    db: Session = Depends(get_read_db),
+    user: User = Depends(require_role(["Admin", "Planner", "Approver", "StoreManager", "Viewer"]))
+):
+    """Transfer lines as parallel column arrays; pass next_cursor back as ?after= for the next page."""
+    return _columnar(request, db, user, plan_id, TransferItem, "items", ITEM_FIELDS, fields, after, limit)
+
+
+@router.get("/api/plans/{plan_id}/kpis")
+def plan_kpis_api(
+    request: Request,
+    plan_id: int,
+    after: int = 0,
+    limit: int = 1000,
+    fields: str = "",
+    db: Session = Depends(get_read_db),
+    user: User = Depends(require_role(["Admin", "Planner", "Approver", "StoreManager", "Viewer"]))
+):
+    """Before/after KPI rows as parallel column arrays, paginated like /items."""
+    return _columnar(request, db, user, plan_id, PlanKpi, "kpis", KPI_FIELDS, fields, after, limit)
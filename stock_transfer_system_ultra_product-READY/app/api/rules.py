@@ -2,8 +2,10 @@ from fastapi import APIRouter, Request, Form, Depends
 from fastapi.responses import RedirectResponse, HTMLResponse
 from sqlalchemy.orm import Session
 from fastapi.templating import Jinja2Templates
-from app.api.deps import get_db, current_user, require_role
+from app.api.deps import get_db, current_user, require_role, mark_write
 from app.models.inventory import Rules
+from app.models.user import User
+from app.services.audit import audit
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -26,9 +28,8 @@ def save_rules(request: Request,
                target_days_cover: int = Form(...),
                min_display: int = Form(...),
                pack_size: int = Form(...),
-               db: Session = Depends(get_db)):
-    user = current_user(request, db)
-    require_role(user, ["Admin", "Planner"])
+               db: Session = Depends(get_db),
+               user: User = Depends(require_role(["Admin", "Planner"]))):
     rules = db.query(Rules).filter(Rules.org_id == user.org_id).first()
     if not rules:
         rules = Rules(org_id=user.org_id)
@@ -37,4 +38,6 @@ def save_rules(request: Request,
     rules.min_display = min_display
     rules.pack_size = pack_size
     db.commit()
+    mark_write(request)
+    audit(user, "rules.update", f"target_days_cover={target_days_cover}, min_display={min_display}, pack_size={pack_size}")
     return RedirectResponse("/rules", status_code=302)
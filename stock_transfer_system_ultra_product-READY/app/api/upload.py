@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Request, UploadFile, Depends
+from fastapi import APIRouter, BackgroundTasks, Request, UploadFile, Depends
 from fastapi.responses import RedirectResponse, HTMLResponse
 from sqlalchemy.orm import Session
 from fastapi.templating import Jinja2Templates
-import io, pandas as pd
+import io, time
 
-from app.api.deps import get_db, current_user, require_role
+from app.api.deps import get_db, current_user, require_role, mark_write
 from app.models.inventory import Sale, Stock, Item, Store
+from app.core.metrics import record_ingest
+from app.services.audit import audit
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -29,6 +31,7 @@ async def upload_page(
 @router.post("/upload/excel")
 async def upload_excel(
     request: Request,
+    background: BackgroundTasks,
     excel: UploadFile = None,
     db: Session = Depends(get_db),
     user=Depends(require_role(["Admin", "Planner"]))
@@ -42,14 +45,18 @@ async def upload_excel(
 
     if not excel:
         return RedirectResponse("/upload", status_code=302)
+    import pandas as pd
 
     try:
         excel_data = await excel.read()
+        t0 = time.perf_counter()
+        batches = {}
         xl_file = pd.ExcelFile(io.BytesIO(excel_data), engine="openpyxl")
 
         # --------------- STORES SHEET ---------------
         if "Stores" in xl_file.sheet_names:
             df = pd.read_excel(xl_file, sheet_name="Stores", engine="openpyxl")
+            batches["stores"] = len(df)
             for _, r in df.iterrows():
                 existing = db.query(Store).filter_by(
                     org_id=user.org_id, store_id=str(r["store_id"])
@@ -69,6 +76,7 @@ async def upload_excel(
         # --------------- ITEMS SHEET ---------------
         if "Items" in xl_file.sheet_names:
             df = pd.read_excel(xl_file, sheet_name="Items", engine="openpyxl")
+            batches["items"] = len(df)
             for _, r in df.iterrows():
                 existing = db.query(Item).filter_by(
                     org_id=user.org_id, item_id=str(r["item_id"])
@@ -88,6 +96,7 @@ async def upload_excel(
         # --------------- SALES SHEET ---------------
         if "Sales" in xl_file.sheet_names:
             df = pd.read_excel(xl_file, sheet_name="Sales", engine="openpyxl")
+            batches["sales"] = len(df)
 
             if "date" not in df.columns:
                 raise ValueError("Missing required 'date' column in Sales sheet")
@@ -102,6 +111,13 @@ async def upload_excel(
                 ))
 
         db.commit()
+        elapsed = time.perf_counter() - t0
+        for kind, rows in batches.items():
+            record_ingest(kind, rows, elapsed)
+        from app.services.snapshots import refresh_snapshot
+        refresh_snapshot(db, user.org_id, background)
+        mark_write(request)
+        audit(user, "upload.excel", f"{excel.filename}: " + ", ".join(f"{k} {n} rows" for k, n in batches.items()))
         return RedirectResponse("/upload", status_code=302)
 
     except Exception as e:
@@ -121,6 +137,7 @@ async def upload_excel(
 @router.post("/upload/csv")
 async def upload_csv(
     request: Request,
+    background: BackgroundTasks,
     csv: UploadFile = None,
     db: Session = Depends(get_db),
     user=Depends(require_role(["Admin", "Planner"]))
@@ -134,15 +151,19 @@ async def upload_csv(
 
     if not csv:
         return RedirectResponse("/upload", status_code=302)
+    import pandas as pd
 
     try:
         content = await csv.read()
         decoded = content.decode("utf-8")
+        t0 = time.perf_counter()
         df = pd.read_csv(io.StringIO(decoded))
         cols = set(df.columns)
+        kind = None
 
         # --------------- STORES CSV ---------------
         if {"store_id", "store_name"}.issubset(cols):
+            kind = "stores"
             for _, r in df.iterrows():
                 existing = db.query(Store).filter_by(
                     org_id=user.org_id, store_id=str(r["store_id"])
@@ -161,6 +182,7 @@ async def upload_csv(
 
         # --------------- ITEMS CSV ---------------
         elif {"item_id", "item_name"}.issubset(cols):
+            kind = "items"
             for _, r in df.iterrows():
                 existing = db.query(Item).filter_by(
                     org_id=user.org_id, item_id=str(r["item_id"])
@@ -179,6 +201,7 @@ async def upload_csv(
 
         # --------------- SALES CSV ---------------
         elif {"store_id", "item_id", "quantity", "date"}.issubset(cols):
+            kind = "sales"
             for _, r in df.iterrows():
                 db.add(Sale(
                     org_id=user.org_id,
@@ -192,6 +215,11 @@ async def upload_csv(
             raise ValueError("Unsupported CSV format or missing required columns")
 
         db.commit()
+        record_ingest(kind, len(df), time.perf_counter() - t0)
+        from app.services.snapshots import refresh_snapshot
+        refresh_snapshot(db, user.org_id, background)
+        mark_write(request)
+        audit(user, "upload.csv", f"{csv.filename}: {kind} {len(df)} rows")
         return RedirectResponse("/upload", status_code=302)
 
     except Exception as e:
@@ -202,3 +230,54 @@ async def upload_csv(
             "year": 2025,
             "error": f"CSV upload failed: {str(e)}"
         })
+
+
+# ========================================================
+# STOCK SNAPSHOT UPLOAD (delta apply, CSV or Excel)
+# ========================================================
+
+@router.post("/upload/stock")
+async def upload_stock(
+    request: Request,
+    background: BackgroundTasks,
+    stock: UploadFile = None,
+    db: Session = Depends(get_db),
+    user=Depends(require_role(["Admin", "Planner"]))
+):
+    """
+    Full on-hand snapshot for the org. Only rows that differ from the current
+    stock table are written; an identical file is skipped entirely.
+    """
+
+    if not stock:
+        return RedirectResponse("/upload", status_code=302)
+    from app.services.stock_ingest import ingest_stock_snapshot
+    from app.services.snapshots import refresh_snapshot
+
+    try:
+        content = await stock.read()
+        t0 = time.perf_counter()
+        counts = ingest_stock_snapshot(db, user.org_id, content, stock.filename or "")
+        record_ingest("stock", counts["rows"], time.perf_counter() - t0)
+        if counts["inserted"] or counts["updated"] or counts["deleted"]:
+            refresh_snapshot(db, user.org_id, background)
+            mark_write(request)
+        audit(user, "upload.stock", f"{stock.filename}: " + ", ".join(
+            f"{k} {counts[k]}" for k in ("rows", "inserted", "updated", "deleted", "skipped")))
+        if counts["skipped"]:
+            message = "Stock snapshot identical to the last upload; nothing to do."
+        else:
+            message = (f"Stock snapshot applied: {counts['inserted']} inserted, {counts['updated']} updated, "
+                       f"{counts['deleted']} deleted, {counts['unchanged']} unchanged.")
+        return templates.TemplateResponse("upload.html", {
+            "request": request, "year": 2025, "message": message, "counts": counts
+        })
+
+    except Exception as e:
+        db.rollback()
+        print(f"Stock Upload Error: {e}")
+        return templates.TemplateResponse("upload.html", {
+            "request": request,
+            "year": 2025,
+            "error": f"Stock upload failed: {str(e)}"
+        })
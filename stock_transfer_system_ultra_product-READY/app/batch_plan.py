@@ -0,0 +1,179 @@
+"""
+Nightly batch planning for every organization.
+
+    python -m app.batch_plan [--workers 4] [--lookback 7] [--method velocity|forecast]
+                             [--mem-mb 2048] [--orgs 1,2,3] [--summary FILE] [--resume FILE]
+
+Each org is one task in a process pool, largest orgs (by stock + sales rows)
+first so the long tail packs in behind them. Workers only compute; the parent
+persists each finished plan with bulk inserts and rewrites the run summary
+(per-org status, duration, lines, error) after every org, so a crashed or
+interrupted run can be continued with --resume, which skips orgs already ok.
+--mem-mb caps each worker's address space: an org that outgrows it fails
+with MemoryError instead of taking the box down. Workers are replaced after
+BATCH_TASKS_PER_CHILD orgs.
+"""
+import argparse, json, multiprocessing, os, time, traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+
+
+def _init_worker(mem_mb: int):
+    if mem_mb:
+        import resource
+        limit = mem_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _plan_org(org_id: int, lookback: int, method: str = "velocity") -> dict:
+    """Runs in a worker: load inputs and plan one org; nothing is written."""
+    from app.core.metrics import current_org
+    from app.db.session import ReadSessionLocal
+    from app.services.planner import compute_velocity, plan_transfers, group_digests, KPI_COLS
+    from app.services.plan_store import org_rules
+    from app.services.snapshots import load_planner_inputs
+
+    current_org.set(str(org_id))
+    start = time.perf_counter()
+    db = ReadSessionLocal()
+    try:
+        sales, stock, stores, source = load_planner_inputs(db, org_id)
+        rules = org_rules(db, org_id)
+    finally:
+        db.close()
+    forecast = None
+    if method == "forecast":
+        from app.services.forecast import forecast_velocity
+        vel, forecast = forecast_velocity(sales, horizon=rules["target_days_cover"] or 7)
+    else:
+        vel = compute_velocity(sales, lookback_days=lookback)
+    plan_df, _, _, kpi = plan_transfers(stock, vel, stores, rules)
+    groups = group_digests(stock, vel, stores, rules)
+    return {"org_id": org_id, "plan_df": plan_df, "kpi": kpi[KPI_COLS], "groups": groups,
+            "rules": rules, "source": source, "forecast": forecast, "compute_seconds": time.perf_counter() - start}
+
+
+def _persist(db, result: dict, lookback: int) -> int:
+    from app.models.plan import TransferPlan
+    from app.services.audit import audit_writer
+    from app.services.plan_store import save_plan_rows, plan_summary, content_hash
+    plan_df, kpi, groups = result["plan_df"], result["kpi"], result["groups"]
+    plan = TransferPlan(org_id=result["org_id"], created_by=None, status="Draft", lookback_days=lookback,
+                        groups_reused=0, groups_recomputed=len(groups), **result["rules"],
+                        content_hash=content_hash(plan_df, kpi), **plan_summary(plan_df))
+    db.add(plan)
+    db.flush()
+    save_plan_rows(db, plan.id, plan_df, kpi, groups)
+    db.commit()
+    audit_writer.record(plan.org_id, None, "plan.create", f"plan {plan.id}: {len(plan_df)} lines, batch")
+    return plan.id
+
+
+def org_sizes(db, only=None):
+    """[(org_id, rows)] largest first; rows = stock + sales rows, a proxy for planning cost."""
+    from app.models.inventory import Sale, Stock
+    from app.models.user import Organization
+    sizes = {org_id: 0 for (org_id,) in db.execute(select(Organization.id))}
+    for model in (Stock, Sale):
+        for org_id, n in db.execute(select(model.org_id, func.count()).group_by(model.org_id)):
+            if org_id in sizes:
+                sizes[org_id] += n
+    if only:
+        sizes = {o: n for o, n in sizes.items() if o in only}
+    return sorted(sizes.items(), key=lambda x: -x[1])
+
+
+def _write_summary(path: str, summary: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def run(workers: int, lookback: int, mem_mb: int, summary_path: str, resume: str | None = None, only=None,
+        method: str = "velocity") -> dict:
+    from app.db.session import SessionLocal
+    db = SessionLocal()
+
+    done = {}
+    if resume:
+        with open(resume) as f:
+            done = {int(k): v for k, v in json.load(f)["orgs"].items() if v["status"] == "ok"}
+    summary = {"started_at": datetime.utcnow().isoformat(), "lookback": lookback, "method": method, "workers": workers,
+               "resumed_from": resume, "orgs": {str(k): v for k, v in done.items()}}
+
+    pending = [(org_id, rows) for org_id, rows in org_sizes(db, only) if org_id not in done]
+    rows_by_org = dict(pending)
+    print(f"planning {len(pending)} orgs with {workers} workers ({len(done)} already done)")
+
+    # spawn: workers build their own engine instead of inheriting the parent's pool;
+    # recycling them every few orgs hands fragmented heap back to the OS
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(mem_mb,),
+                             max_tasks_per_child=settings.BATCH_TASKS_PER_CHILD or None) as pool:
+        started = {}
+        futures = {}
+        for org_id, _ in pending:
+            futures[pool.submit(_plan_org, org_id, lookback, method)] = org_id
+            started[org_id] = time.perf_counter()
+        for fut in as_completed(futures):
+            org_id = futures[fut]
+            entry = {"status": "ok", "rows": rows_by_org[org_id]}
+            try:
+                result = fut.result()
+                entry.update(plan_id=_persist(db, result, lookback), lines=len(result["plan_df"]),
+                             compute_seconds=round(result["compute_seconds"], 3), source=result["source"])
+                if result["forecast"]:
+                    entry["forecast"] = result["forecast"]
+            except BrokenProcessPool:
+                db.rollback()
+                entry.update(status="failed", error="worker process died (killed or crashed)")
+            except Exception as e:
+                db.rollback()
+                entry.update(status="failed", error=f"{type(e).__name__}: {e}",
+                             traceback=traceback.format_exc(limit=5))
+            # wall time from submission; includes queueing behind larger orgs
+            entry["seconds"] = round(time.perf_counter() - started[org_id], 3)
+            summary["orgs"][str(org_id)] = entry
+            _write_summary(summary_path, summary)
+            detail = entry.get("error", "").split("\n")[0] if entry["status"] != "ok" else f"{entry['lines']} lines"
+            print(f"org {org_id}: {entry['status']} in {entry['seconds']}s, {detail}")
+
+    db.close()
+    from app.services.audit import audit_writer
+    audit_writer.stop()
+    results = summary["orgs"].values()
+    summary.update(finished_at=datetime.utcnow().isoformat(),
+                   ok=sum(1 for r in results if r["status"] == "ok"),
+                   failed=sum(1 for r in results if r["status"] != "ok"))
+    _write_summary(summary_path, summary)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--lookback", type=int, default=7)
+    parser.add_argument("--mem-mb", type=int, default=settings.BATCH_WORKER_MEM_MB,
+                        help="address-space cap per worker, 0 for none")
+    parser.add_argument("--method", choices=["velocity", "forecast"], default="velocity",
+                        help="demand estimate: lookback average or seasonal forecast")
+    parser.add_argument("--orgs", default="", help="comma-separated org ids (default: all)")
+    parser.add_argument("--summary", default="", help="summary JSON path")
+    parser.add_argument("--resume", default=None, help="summary JSON of a previous run; its ok orgs are skipped")
+    args = parser.parse_args()
+    if not 1 <= args.lookback <= settings.MAX_LOOKBACK_DAYS:
+        parser.error(f"--lookback must be between 1 and {settings.MAX_LOOKBACK_DAYS} (MAX_LOOKBACK_DAYS)")
+
+    path = args.summary or args.resume or os.path.join(
+        settings.DATA_DIR, "batch", f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    only = {int(o) for o in args.orgs.split(",") if o.strip()}
+    s = run(args.workers, args.lookback, args.mem_mb, path, args.resume, only, args.method)
+    print(f"done: {s['ok']} ok, {s['failed']} failed; summary at {path}")
+    raise SystemExit(1 if s["failed"] else 0)
@@ -0,0 +1,110 @@
+"""
+One-time schema creation and admin seeding.
+
+    python -m app.bootstrap                  # create/upgrade tables + seed admin
+    python -m app.bootstrap --check-imports  # fail if importing app.main got slow/heavy
+
+Workers call bootstrap() from the lifespan hook when BOOTSTRAP_ON_STARTUP is
+set; the lock makes concurrent workers run it one at a time, and seeding is
+idempotent so only the first one does any work.
+"""
+import argparse, hashlib, json, os, subprocess, sys, tempfile
+from contextlib import contextmanager
+
+from sqlalchemy import inspect, text
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl")
+LOCK_KEY = 7301  # pg_advisory_lock key for bootstrap
+
+
+@contextmanager
+def _bootstrap_lock(engine):
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": LOCK_KEY})
+    else:
+        # SQLite and friends: the database is a local file, so a host-level file lock will do
+        import fcntl
+        name = hashlib.sha1(str(engine.url).encode()).hexdigest()[:16]
+        with open(os.path.join(tempfile.gettempdir(), f"stock-transfer-bootstrap-{name}.lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _add_missing_columns(engine, metadata):
+    """
+    create_all skips tables that already exist, so columns added to a model
+    since are missing on upgraded databases. Add them with ALTER TABLE; they
+    are all nullable, so existing rows simply get NULL.
+    """
+    insp = inspect(engine)
+    existing_tables = set(insp.get_table_names())
+    prep = engine.dialect.identifier_preparer
+    added = []
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            have = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in have:
+                    continue
+                if not col.nullable:
+                    raise RuntimeError(f"cannot add NOT NULL column {table.name}.{col.name} to an existing table")
+                conn.execute(text(f"ALTER TABLE {prep.format_table(table)} ADD COLUMN {prep.format_column(col)} "
+                                  f"{col.type.compile(dialect=engine.dialect)}"))
+                added.append(f"{table.name}.{col.name}")
+    if added:
+        print(f"added columns: {', '.join(added)}")
+    return added
+
+
+def bootstrap():
+    from app.db.session import engine, SessionLocal
+    from app.db.base import Base
+    from app.api.auth import seed_admin
+    import app.models.audit, app.models.inventory, app.models.plan, app.models.user  # noqa: F401 register tables
+
+    with _bootstrap_lock(engine):
+        Base.metadata.create_all(bind=engine)
+        _add_missing_columns(engine, Base.metadata)
+        # create_all skips tables that already exist; add indexes declared on them since
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+        db = SessionLocal()
+        try:
+            seed_admin(db)
+        finally:
+            db.close()
+
+
+def check_imports(budget: float) -> int:
+    """Import app.main in a fresh interpreter; non-zero exit if over budget or a heavy module loaded."""
+    probe = (
+        "import json, sys, time; t = time.perf_counter(); import app.main; "
+        "print(json.dumps({'seconds': time.perf_counter() - t, "
+        f"'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))"
+    )
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    print(f"import app.main: {result['seconds']:.3f}s (budget {budget:.3f}s), heavy modules: {result['heavy'] or 'none'}")
+    return 0 if result["seconds"] <= budget and not result["heavy"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check-imports", action="store_true")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds allowed for `import app.main`")
+    args = parser.parse_args()
+    if args.check_imports:
+        sys.exit(check_imports(args.budget))
+    bootstrap()
+    print("bootstrap complete")
@@ -8,9 +8,32 @@ class Settings:
     BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
     ENV = os.getenv("ENV", "dev")
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+    READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+    READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
     ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@example.com")
     ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin123")
     ADMIN_NAME = os.getenv("ADMIN_NAME", "Admin")
+    BOOTSTRAP_ON_STARTUP = os.getenv("BOOTSTRAP_ON_STARTUP", "1") == "1"
     SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", "")
+    NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "1000"))
+    NOTIFY_COALESCE_SECONDS = float(os.getenv("NOTIFY_COALESCE_SECONDS", "2"))
+    NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", "3"))
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+    AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "2"))
+    AUDIT_BUFFER_MAX = int(os.getenv("AUDIT_BUFFER_MAX", "10000"))
+    EXPORTS_DIR = os.getenv("EXPORTS_DIR", "exports")
+    EXPORT_DISK_BUDGET_MB = float(os.getenv("EXPORT_DISK_BUDGET_MB", "500"))
+    DATA_DIR = os.getenv("DATA_DIR", "data")
+    SALES_RETENTION_DAYS = int(os.getenv("SALES_RETENTION_DAYS", "120"))
+    # longest /plan lookback; retention never compacts inside it
+    MAX_LOOKBACK_DAYS = int(os.getenv("MAX_LOOKBACK_DAYS", "56"))
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(DATA_DIR, "archive"))
+    SNAPSHOTS_ENABLED = os.getenv("SNAPSHOTS_ENABLED", "1") == "1"
+    BATCH_WORKER_MEM_MB = int(os.getenv("BATCH_WORKER_MEM_MB", "2048"))
+    BATCH_TASKS_PER_CHILD = int(os.getenv("BATCH_TASKS_PER_CHILD", "4"))
+    PROFILES_DIR = os.getenv("PROFILES_DIR", "profiles")
+    PROFILE_MIN_INTERVAL = float(os.getenv("PROFILE_MIN_INTERVAL", "30"))
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
 
 settings = Settings()
@@ -0,0 +1,207 @@
+import time, threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.middleware.base import BaseHTTPMiddleware
+
+# Org of the request being served; set by MetricsMiddleware so stage timers
+# deep in the planner can label by tenant without threading org_id through.
+current_org: ContextVar[str] = ContextVar("current_org", default="none")
+# Per-request SQL stats, mutated by the engine event hooks below.
+current_sql: ContextVar[dict | None] = ContextVar("current_sql", default=None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _fmt_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (list(extra) if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                    for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.kind = "counter"
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(str(labels.get(l, "")) for l in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self.kind = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(l, "")) for l in self.labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.kind = "histogram"
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(l, "")) for l in self.labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, row in items:
+            for i, b in enumerate(self.buckets):
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, [('le', b)])} {row[i]}")
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, [('le', '+Inf')])} {row[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {row[-2]}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {row[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kw):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, labels, **kw)
+            return m
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        out = []
+        for m in metrics:
+            out.append(f"# HELP {m.name} {m.help}")
+            out.append(f"# TYPE {m.name} {m.kind}")
+            out.extend(m.render())
+        return "\n".join(out) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Request latency per route", ("method", "route", "status", "org"))
+PLAN_STAGE = registry.histogram(
+    "plan_stage_duration_seconds", "Time spent in each planning stage", ("stage", "org"))
+INGEST_ROWS = registry.counter(
+    "ingest_rows_total", "Rows ingested by upload kind", ("kind", "org"))
+INGEST_BATCH = registry.histogram(
+    "ingest_batch_rows", "Rows per ingest batch", ("kind", "org"),
+    buckets=(10, 100, 1000, 10000, 100000, 1000000))
+INGEST_RATE = registry.histogram(
+    "ingest_rows_per_second", "Ingest throughput per batch", ("kind", "org"),
+    buckets=(100, 1000, 5000, 10000, 50000, 100000, 500000))
+SQL_QUERY = registry.histogram(
+    "sql_query_duration_seconds", "Duration of individual SQL statements", ("org",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+SQL_PER_REQUEST = registry.histogram(
+    "sql_queries_per_request", "SQL statements issued per request", ("route", "org"),
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 500, 1000))
+SQL_TIME_PER_REQUEST = registry.histogram(
+    "sql_duration_per_request_seconds", "Total SQL time per request", ("route", "org"))
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a planning stage into PLAN_STAGE, labelled with the current org."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PLAN_STAGE.observe(time.perf_counter() - start, stage=stage, org=current_org.get())
+
+
+def observe_stage(stage: str, start: float):
+    """Record a stage that began at ``start`` (a time.perf_counter() value)."""
+    PLAN_STAGE.observe(time.perf_counter() - start, stage=stage, org=current_org.get())
+
+
+def record_ingest(kind: str, rows: int, seconds: float):
+    org = current_org.get()
+    INGEST_ROWS.inc(rows, kind=kind, org=org)
+    INGEST_BATCH.observe(rows, kind=kind, org=org)
+    if seconds > 0:
+        INGEST_RATE.observe(rows / seconds, kind=kind, org=org)
+
+
+def instrument_engine(engine):
+    """Attach cursor-level timing hooks to a SQLAlchemy engine."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        SQL_QUERY.observe(elapsed, org=current_org.get())
+        stats = current_sql.get()
+        if stats is not None:
+            stats["count"] += 1
+            stats["seconds"] += elapsed
+            if "statements" in stats:  # request is being profiled
+                stats["statements"].append((statement, elapsed, cursor.rowcount))
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    """Records per-route latency and SQL usage. Must sit inside SessionMiddleware."""
+
+    async def dispatch(self, request, call_next):
+        org = str(request.scope.get("session", {}).get("org_id") or "none")
+        org_token = current_org.set(org)
+        stats = {"count": 0, "seconds": 0.0}
+        sql_token = current_sql.set(stats)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method=request.method,
+                                    route=path, status=status, org=org)
+            SQL_PER_REQUEST.observe(stats["count"], route=path, org=org)
+            SQL_TIME_PER_REQUEST.observe(stats["seconds"], route=path, org=org)
+            current_sql.reset(sql_token)
+            current_org.reset(org_token)
@@ -0,0 +1,231 @@
+import asyncio, contextvars, os, re, sys, time, threading
+from collections import Counter as Tally
+from datetime import datetime
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import current_sql
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_NAME = re.compile(r"^[\w.-]+$")
+
+# set by the middleware for the profiled request; copied into the threadpool with the rest of the context
+profiled_request = contextvars.ContextVar("profiled_request", default=None)
+CONTEXT_SEARCH_DEPTH = 12
+
+_lock = threading.Lock()
+_last_run = 0.0
+_running = False
+
+
+def _wants_profile(scope) -> bool:
+    if b"profile=1" in scope.get("query_string", b"").split(b"&"):
+        return True
+    for k, v in scope.get("headers", ()):
+        if k == b"x-profile" and v == b"1":
+            return True
+    return False
+
+
+def _acquire_slot() -> bool:
+    """One profiled request at a time, at most once per PROFILE_MIN_INTERVAL."""
+    global _last_run, _running
+    with _lock:
+        now = time.monotonic()
+        if _running or now - _last_run < settings.PROFILE_MIN_INTERVAL:
+            return False
+        _running, _last_run = True, now
+        return True
+
+
+def _release_slot():
+    global _running
+    with _lock:
+        _running = False
+
+
+def _is_admin(email) -> bool:
+    from app.db.session import SessionLocal
+    from app.models.user import User
+    if not email:
+        return False
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        return bool(user and user.role == "Admin")
+    finally:
+        db.close()
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(APP_DIR):
+        return os.path.relpath(filename, APP_DIR)
+    head, sep, tail = filename.rpartition("site-packages" + os.sep)
+    return tail if sep else os.path.basename(filename)
+
+
+def _running_context(frame):
+    """
+    The contextvars.Context a thread is currently running, read off the frame
+    that entered it: the threadpool worker's `context` local, or the event
+    loop's `Handle._context`. Both sit near the bottom of the stack.
+    """
+    outer = []
+    while frame is not None:
+        outer.append(frame)
+        frame = frame.f_back
+    for f in reversed(outer[-CONTEXT_SEARCH_DEPTH:]):
+        local = f.f_locals
+        ctx = local.get("context")
+        if isinstance(ctx, contextvars.Context):
+            return ctx
+        handle = local.get("self")
+        if isinstance(handle, asyncio.Handle):
+            return handle._context
+    return None
+
+
+class Sampler(threading.Thread):
+    """
+    Wall-clock sampling profiler.
+
+    Sync endpoints run in the threadpool, out of reach of a cProfile enabled
+    on the event loop thread, so we sample thread stacks instead. Only threads
+    running this request's context (marked via `profiled_request`) are kept,
+    and of those only stacks executing code from the app package; background
+    workers and concurrent requests are left out.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.token = object()
+        self.stacks = Tally()
+        self.samples = 0
+        self._halt = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._halt.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                try:
+                    ctx = _running_context(frame)
+                except Exception:
+                    continue  # the thread moved on while we were looking
+                if ctx is None or ctx.get(profiled_request) is not self.token:
+                    continue
+                stack, in_app = [], False
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_filename.startswith(APP_DIR) and not code.co_filename.endswith("profiling.py"):
+                        in_app = True
+                    stack.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if in_app:
+                    self.stacks[";".join(reversed(stack))] += 1
+                    self.samples += 1
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+def write_report(name: str, request_line: str, elapsed: float, sampler: Sampler, statements: list) -> str:
+    os.makedirs(settings.PROFILES_DIR, exist_ok=True)
+    with open(os.path.join(settings.PROFILES_DIR, name + ".collapsed"), "w") as f:
+        for stack, n in sampler.stacks.most_common():
+            f.write(f"{stack} {n}\n")
+
+    own, total = Tally(), Tally()
+    for stack, n in sampler.stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += n
+        for fn in set(frames):
+            total[fn] += n
+
+    top = settings.PROFILE_TOP_N
+    lines = [
+        request_line,
+        f"wall time: {elapsed:.3f}s  samples: {sampler.samples}  interval: {sampler.interval * 1000:.1f}ms",
+        "",
+        f"{'self':>8} {'total':>8}  function",
+    ]
+    for fn, n in total.most_common(top):
+        lines.append(f"{own[fn]:>8} {n:>8}  {fn}")
+    lines += ["", f"SQL statements: {len(statements)}  total: {sum(s[1] for s in statements):.3f}s",
+              f"{'ms':>9} {'rows':>7}  statement"]
+    for stmt, secs, rows in sorted(statements, key=lambda s: -s[1])[:top]:
+        lines.append(f"{secs * 1000:>9.2f} {rows:>7}  {' '.join(stmt.split())[:200]}")
+    with open(os.path.join(settings.PROFILES_DIR, name + ".txt"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return name
+
+
+def list_reports():
+    if not os.path.isdir(settings.PROFILES_DIR):
+        return []
+    return sorted((f[:-4] for f in os.listdir(settings.PROFILES_DIR) if f.endswith(".txt")), reverse=True)
+
+
+def report_path(name: str, ext: str):
+    if not REPORT_NAME.match(name) or ext not in ("txt", "collapsed"):
+        return None
+    path = os.path.join(settings.PROFILES_DIR, f"{name}.{ext}")
+    return path if os.path.isfile(path) else None
+
+
+class ProfilerMiddleware:
+    """
+    Admin-only request profiling via ``?profile=1`` or ``X-Profile: 1``.
+
+    Plain ASGI so unprofiled requests only pay for the flag check. Must sit
+    inside SessionMiddleware and MetricsMiddleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            return await self.app(scope, receive, send)
+        email = scope.get("session", {}).get("user_email")
+        if not await run_in_threadpool(_is_admin, email) or not _acquire_slot():
+            return await self.app(scope, receive, send)
+
+        org = scope.get("session", {}).get("org_id") or "none"
+        slug = re.sub(r"[^\w]+", "_", scope["path"]).strip("_") or "root"
+        name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_org{org}_{slug}"
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-report", name.encode())]
+            await send(message)
+
+        stats = current_sql.get()
+        token = None
+        if stats is None:
+            token = current_sql.set({"count": 0, "seconds": 0.0})
+            stats = current_sql.get()
+        stats["statements"] = []
+        sampler = Sampler(settings.PROFILE_INTERVAL_MS / 1000.0)
+        marker = profiled_request.set(sampler.token)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            sampler.stop()
+            profiled_request.reset(marker)
+            elapsed = time.perf_counter() - start
+            statements = stats.pop("statements")
+            if token is not None:
+                current_sql.reset(token)
+            try:
+                request_line = f"{scope['method']} {scope['path']}?{scope.get('query_string', b'').decode()}"
+                await run_in_threadpool(write_report, name, request_line, elapsed, sampler, statements)
+            finally:
+                _release_slot()
@@ -1,5 +1,13 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 engine = create_engine(settings.DATABASE_URL, future=True)
+instrument_engine(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+# optional read replica; without READ_DATABASE_URL reads go to the primary
+read_engine = create_engine(settings.READ_DATABASE_URL, future=True) if settings.READ_DATABASE_URL else engine
+if read_engine is not engine:
+    instrument_engine(read_engine)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
@@ -0,0 +1,263 @@
+"""
+End-to-end HTTP load test.
+
+    python -m app.loadtest [--users 20] [--duration 30] [--warmup 5]
+                           [--mix "/=3,/plan=1,pick=4,upload=1,approvals=2"]
+                           [--stores 10] [--skus 100] [--days 28]
+                           [--database-url URL] [--server-workers 1] [--out report.json]
+
+Seeds a scratch database (a temporary SQLite file unless --database-url points
+at an empty Postgres database), boots uvicorn against it, logs in one user per
+role and runs --users concurrent virtual users for --duration seconds. Each
+virtual user has a role (round robin) and picks its next request from the
+weighted mix, restricted to the routes its role may call. The JSON report
+has throughput plus p50/p95/p99 latency and error rate per route.
+"""
+import argparse, asyncio, json, os, random, re, shutil, socket, subprocess, sys, tempfile, time
+from datetime import date, datetime, timedelta
+
+import httpx
+
+PASSWORD = "loadtest"
+ROLES = ["Planner", "StoreManager", "Approver", "Viewer", "Admin"]
+# name -> (label, roles allowed to call it)
+ROUTES = {
+    "/": ("/", set(ROLES)),
+    "/plan": ("/plan", set(ROLES)),
+    "pick": ("/plan/{id}/pick.csv", set(ROLES)),
+    "upload": ("/upload/csv", {"Admin", "Planner"}),
+    "approvals": ("/approvals", set(ROLES)),
+}
+DEFAULT_MIX = "/=3,/plan=1,pick=4,upload=1,approvals=2"
+PLAN_LINK = re.compile(r"/plan/(\d+)/pick\.csv")
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in ROUTES:
+            raise SystemExit(f"unknown route {name!r} in --mix; choose from {', '.join(ROUTES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def seed(stores: int, skus: int, days: int):
+    """Create tables, admin, one user per role and synthetic stores/items/sales/stock. Returns org id."""
+    # imported here: settings are read from the environment prepared by main()
+    from sqlalchemy import insert
+    from app.bootstrap import bootstrap
+    from app.core.security import hash_password
+    from app.db.session import SessionLocal
+    from app.models.inventory import Item, Sale, Stock, Store
+    from app.models.user import User
+    from app.core.config import settings
+
+    bootstrap()
+    db = SessionLocal()
+    org_id = db.query(User).filter_by(email=settings.ADMIN_EMAIL).one().org_id
+    hashed = hash_password(PASSWORD)
+    for role in ROLES:
+        email = f"loadtest-{role.lower()}@example.com"
+        if not db.query(User).filter_by(email=email).first():
+            db.add(User(email=email, name=f"Load {role}", role=role, hashed_password=hashed, org_id=org_id))
+
+    rng = random.Random(42)
+    store_rows = [{"org_id": org_id, "store_id": f"S{i}", "store_name": f"Store {i}", "priority": rng.randint(1, 3)}
+                  for i in range(stores)]
+    item_rows = [{"org_id": org_id, "sku": f"SKU-{k // 3:05d}", "style": f"Style {k // 3}",
+                  "size": "SML"[k % 3], "category": "Load"} for k in range(skus)]
+    today = date.today()
+    sales, stock = [], []
+    for s in store_rows:
+        for it in item_rows:
+            key = {"org_id": org_id, "store_id": s["store_id"], "store_name": s["store_name"],
+                   "sku": it["sku"], "style": it["style"], "size": it["size"]}
+            rate = rng.uniform(0, 4)
+            sales += [{**key, "date": today - timedelta(days=d), "units_sold": int(rng.expovariate(1 / (rate + 0.01)))}
+                      for d in range(days)]
+            stock.append({**key, "on_hand": rng.randint(0, 40)})
+    for model, rows in ((Store, store_rows), (Item, item_rows), (Sale, sales), (Stock, stock)):
+        db.execute(insert(model), rows)
+    db.commit()
+    db.close()
+    print(f"seeded org {org_id}: {stores} stores, {skus} SKUs, {len(sales)} sales rows")
+    return org_id
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, workers: int, env: dict) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                             "--port", str(port), "--workers", str(workers), "--log-level", "warning"], env=env)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with {proc.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("server did not become healthy within 60s")
+
+
+def _pct(sorted_vals, q: float):
+    if not sorted_vals:
+        return None
+    i = min(len(sorted_vals) - 1, max(0, round(q / 100 * len(sorted_vals)) - 1))
+    return round(sorted_vals[i] * 1000, 2)
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}  # label -> [(seconds, ok, status)]
+        self.recording = False
+
+    def add(self, label, seconds, ok, status):
+        if self.recording:
+            self.samples.setdefault(label, []).append((seconds, ok, status))
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for label, samples in sorted(self.samples.items()):
+            lat = sorted(s for s, _, _ in samples)
+            errors = sum(1 for _, ok, _ in samples if not ok)
+            statuses = {}
+            for _, _, st in samples:
+                statuses[str(st)] = statuses.get(str(st), 0) + 1
+            routes[label] = {
+                "requests": len(samples), "rps": round(len(samples) / elapsed, 2),
+                "errors": errors, "error_rate": round(errors / len(samples), 4),
+                "p50_ms": _pct(lat, 50), "p95_ms": _pct(lat, 95), "p99_ms": _pct(lat, 99),
+                "max_ms": round(lat[-1] * 1000, 2), "mean_ms": round(sum(lat) / len(lat) * 1000, 2),
+                "status": statuses,
+            }
+        total = sum(r["requests"] for r in routes.values())
+        errors = sum(r["errors"] for r in routes.values())
+        return {"requests": total, "rps": round(total / elapsed, 2), "errors": errors,
+                "error_rate": round(errors / total, 4) if total else 0.0, "routes": routes}
+
+
+async def login(base: str, role: str) -> httpx.AsyncClient:
+    client = httpx.AsyncClient(base_url=base, timeout=60, follow_redirects=False)
+    r = await client.post("/login", data={"email": f"loadtest-{role.lower()}@example.com", "password": PASSWORD})
+    if r.status_code != 302 or "session" not in client.cookies:
+        raise SystemExit(f"login failed for {role}: {r.status_code}")
+    return client
+
+
+async def virtual_user(client, role, mix, plan_ids, upload_csv, rec: Recorder, stop_at, rng):
+    names = [n for n in mix if role in ROUTES[n][1]]
+    weights = [mix[n] for n in names]
+    if not names:
+        return
+    while time.perf_counter() < stop_at:
+        name = rng.choices(names, weights)[0]
+        label = ROUTES[name][0]
+        t0 = time.perf_counter()
+        try:
+            if name == "pick":
+                r = await client.get(f"/plan/{rng.choice(plan_ids)}/pick.csv")
+            elif name == "upload":
+                r = await client.post("/upload/csv", files={"csv": ("stores.csv", upload_csv, "text/csv")})
+            else:
+                r = await client.get(name)
+            # upload reports failures as a 200 page with an error banner
+            ok = r.status_code < 400 and not (name == "upload" and r.status_code == 200)
+            status = r.status_code
+            if name == "/plan" and ok:
+                plan_ids.extend(int(m) for m in PLAN_LINK.findall(r.text)[:1])
+        except httpx.HTTPError as e:
+            ok, status = False, type(e).__name__
+        rec.add(label, time.perf_counter() - t0, ok, status)
+
+
+async def drive(base: str, users: int, duration: float, warmup: float, mix: dict, stores: int) -> dict:
+    roles = sorted({ROLES[i % len(ROLES)] for i in range(users)}, key=ROLES.index)
+    clients = {}
+    for role in roles:
+        clients[role] = await login(base, role)
+
+    # one plan up front so pick-list downloads have something to fetch
+    r = await clients.get("Planner", next(iter(clients.values()))).get("/plan")
+    plan_ids = [int(m) for m in PLAN_LINK.findall(r.text)[:1]]
+    if not plan_ids:
+        raise SystemExit(f"could not create an initial plan: {r.status_code}")
+    upload_csv = "store_id,store_name,priority\n" + "".join(
+        f"S{i},Store {i},{1 + i % 3}\n" for i in range(stores))
+
+    rec = Recorder()
+    start = time.perf_counter()
+    stop_at = start + warmup + duration
+    tasks = [virtual_user(clients[ROLES[i % len(ROLES)]], ROLES[i % len(ROLES)], mix, plan_ids,
+                          upload_csv.encode(), rec, stop_at, random.Random(i)) for i in range(users)]
+
+    async def arm():
+        await asyncio.sleep(warmup)
+        rec.recording = True
+    await asyncio.gather(arm(), *tasks)
+    for c in clients.values():
+        await c.aclose()
+    return rec.report(duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"route weights (default {DEFAULT_MIX})")
+    parser.add_argument("--stores", type=int, default=10)
+    parser.add_argument("--skus", type=int, default=100)
+    parser.add_argument("--days", type=int, default=28, help="days of sales history to seed")
+    parser.add_argument("--database-url", default="", help="empty scratch database (default: temp SQLite)")
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--out", default="", help="report path (default: loadtest_<ts>.json)")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    scratch = tempfile.mkdtemp(prefix="loadtest-")
+    env = dict(os.environ,
+               DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(scratch, 'app.db')}",
+               READ_DATABASE_URL="", BOOTSTRAP_ON_STARTUP="0", SLACK_WEBHOOK_URL="",
+               DATA_DIR=os.path.join(scratch, "data"), EXPORTS_DIR=os.path.join(scratch, "exports"),
+               PROFILES_DIR=os.path.join(scratch, "profiles"))
+    os.environ.update(env)
+    seed(args.stores, args.skus, args.days)
+
+    port = _free_port()
+    server = start_server(port, args.server_workers, env)
+    try:
+        report = asyncio.run(drive(f"http://127.0.0.1:{port}", args.users, args.duration, args.warmup,
+                                   mix, args.stores))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "started_at": datetime.utcnow().isoformat(),
+        "config": {"users": args.users, "duration": args.duration, "warmup": args.warmup, "mix": mix,
+                   "stores": args.stores, "skus": args.skus, "days": args.days,
+                   "database": env["DATABASE_URL"].split(":", 1)[0], "server_workers": args.server_workers},
+        **report,
+    }
+    out = args.out or f"loadtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"{report['requests']} requests, {report['rps']} req/s, error rate {report['error_rate']:.2%}")
+    for label, r in report["routes"].items():
+        print(f"  {label:24} {r['requests']:6} req  p50 {r['p50_ms']}ms  p95 {r['p95_ms']}ms  "
+              f"p99 {r['p99_ms']}ms  errors {r['errors']}")
+    print(f"report written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,36 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.core.config import settings
-from app.db.session import engine, SessionLocal
-from app.db.base import Base
-from app.api import auth as auth_routes, pages as pages_routes, upload as upload_routes, rules as rules_routes, plan as plan_routes, approvals as approvals_routes, admin as admin_routes
-from app.api.auth import seed_admin
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.profiling import ProfilerMiddleware
+from app.api import auth as auth_routes, pages as pages_routes, upload as upload_routes, rules as rules_routes, plan as plan_routes, approvals as approvals_routes, admin as admin_routes, plan_api as plan_api_routes
+from app.services.notify import dispatcher
+from app.services.audit import audit_writer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # multi-worker deployments run `python -m app.bootstrap` once and disable this
+    if settings.BOOTSTRAP_ON_STARTUP:
+        from app.bootstrap import bootstrap
+        bootstrap()
+    yield
+    dispatcher.stop()
+    audit_writer.stop()
 
-app = FastAPI(title=settings.APP_NAME)
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
+# added first so they run inside SessionMiddleware and can see the org/user
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
-app.mount("/exports", StaticFiles(directory="exports"), name="exports")
-
-Base.metadata.create_all(bind=engine)
-db = SessionLocal(); seed_admin(db); db.close()
 
 app.include_router(auth_routes.router)
 app.include_router(pages_routes.router)
@@ -25,6 +39,11 @@ app.include_router(rules_routes.router)
 app.include_router(plan_routes.router)
 app.include_router(approvals_routes.router)
 app.include_router(admin_routes.router)
+app.include_router(plan_api_routes.router)
 
 @app.get("/health")
 def health(): return {"ok": True}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
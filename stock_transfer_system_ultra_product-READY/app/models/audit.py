@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from datetime import datetime
 from app.db.base import Base
 
@@ -10,3 +10,5 @@ class AuditLog(Base):
     action = Column(String)
     detail = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # the admin view pages an org's log newest first
+    __table_args__ = (Index("ix_audit_logs_org_id_created_at", "org_id", "created_at"),)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Date, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Date, DateTime, Index, UniqueConstraint
+from datetime import datetime
 from app.db.base import Base
 
 class Store(Base):
@@ -31,6 +32,21 @@ class Sale(Base):
     size = Column(String)
     units_sold = Column(Integer)
 
+class SalesWeekly(Base):
+    """Sales older than the retention horizon, rolled up per week (Monday start); raw rows are archived."""
+    __tablename__ = "sales_weekly"
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, index=True)
+    week_start = Column(Date)
+    store_id = Column(String)
+    store_name = Column(String)
+    sku = Column(String)
+    style = Column(String)
+    size = Column(String)
+    units_sold = Column(Integer, default=0)
+    raw_rows = Column(Integer, default=0)  # raw sales rows rolled in; the row goes when a restore brings it to 0
+    __table_args__ = (Index("ix_sales_weekly_org_id_week_start", "org_id", "week_start"),)
+
 class Stock(Base):
     __tablename__ = "stock"
     id = Column(Integer, primary_key=True)
@@ -49,3 +65,21 @@ class Rules(Base):
     target_days_cover = Column(Integer, default=7)
     min_display = Column(Integer, default=1)
     pack_size = Column(Integer, default=1)
+
+class DataVersion(Base):
+    """Bumped on every upload; planner snapshots are valid only for the version they were built from."""
+    __tablename__ = "data_versions"
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, unique=True, index=True)
+    version = Column(Integer, default=0)
+
+class IngestFingerprint(Base):
+    """Content hash of the last file ingested per org and kind, to skip identical re-uploads."""
+    __tablename__ = "ingest_fingerprints"
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, index=True)
+    kind = Column(String)
+    content_hash = Column(String)
+    rows = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (UniqueConstraint('org_id','kind', name='uq_org_ingest_kind'),)
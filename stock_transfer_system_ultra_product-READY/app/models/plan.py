@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -10,7 +10,21 @@ class TransferPlan(Base):
     created_by = Column(Integer, index=True)
     status = Column(String, default="Draft")
     lookback_days = Column(Integer, default=7)
+    # rules in force when the plan was made (NULL on older plans)
+    target_days_cover = Column(Integer, nullable=True)
+    min_display = Column(Integer, nullable=True)
+    pack_size = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # incremental plans carry unchanged groups forward from base_plan_id
+    base_plan_id = Column(Integer, nullable=True)
+    groups_reused = Column(Integer, default=0)
+    groups_recomputed = Column(Integer, default=0)
+    # summary aggregates, stored when the plan is saved (NULL on older plans)
+    line_count = Column(Integer, nullable=True)
+    total_units = Column(Integer, nullable=True)
+    store_count = Column(Integer, nullable=True)
+    # sha256 of the saved lines + KPIs; plans are immutable once saved, so this backs API ETags
+    content_hash = Column(String, nullable=True)
     items = relationship("TransferItem", back_populates="plan")
 
 class TransferItem(Base):
@@ -26,6 +40,8 @@ class TransferItem(Base):
     size = Column(String)
     qty = Column(Integer)
     plan = relationship("TransferPlan", back_populates="items")
+    # keyset pagination walks (plan_id, id)
+    __table_args__ = (Index("ix_transfer_items_plan_id_id", "plan_id", "id"),)
 
 class PlanComment(Base):
     __tablename__ = "plan_comments"
@@ -34,3 +50,41 @@ class PlanComment(Base):
     user_email = Column(String)
     comment = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class PlanKpi(Base):
+    __tablename__ = "plan_kpis"
+    id = Column(Integer, primary_key=True)
+    plan_id = Column(Integer, index=True)
+    store_id = Column(String)
+    store_name = Column(String)
+    sku = Column(String)
+    style = Column(String)
+    size = Column(String)
+    avg_daily_sales = Column(Float)
+    on_hand_before = Column(Integer, nullable=True)
+    on_hand_after = Column(Integer)
+    days_cover_before = Column(Float, nullable=True)
+    days_cover_after = Column(Float)
+
+
+class PlanGroup(Base):
+    """Input fingerprint of one (sku, style, size) group, used for incremental replanning."""
+    __tablename__ = "plan_groups"
+    id = Column(Integer, primary_key=True)
+    plan_id = Column(Integer, index=True)
+    sku = Column(String)
+    style = Column(String)
+    size = Column(String)
+    digest = Column(String)
+
+
+class ExportArtifact(Base):
+    """An Excel export in EXPORTS_DIR, named by a hash of the plan content and parameters."""
+    __tablename__ = "export_artifacts"
+    id = Column(Integer, primary_key=True)
+    content_key = Column(String, unique=True, index=True)
+    filename = Column(String)
+    size_bytes = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
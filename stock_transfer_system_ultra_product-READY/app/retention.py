@@ -0,0 +1,229 @@
+"""
+Sales retention: keep raw `sales` rows only for the planning horizon.
+
+    python -m app.retention compact [--org 1] [--days 120] [--vacuum]
+    python -m app.retention restore --org 1 --month 2025-08
+
+compact rolls every org's sales older than the horizon (counted back from the
+org's latest sale, rounded down to a Monday so no week is split) into
+`sales_weekly`. One month at a time, it writes the raw rows to
+ARCHIVE_DIR/org_<id>/<YYYY-MM>/sales_<first>_<last>_<id>.csv.gz, then adds them to
+the weekly rows and deletes them in one transaction. It reports rows
+compacted, archive bytes and database size before/after (SQLite files shrink
+only with --vacuum).
+
+restore re-imports a month's archives into `sales`, subtracts them from the
+weekly rows and renames the files to *.restored.
+"""
+import argparse, glob, gzip, json, os
+from datetime import timedelta
+
+import pandas as pd
+from sqlalchemy import delete, func, insert, select, text, update
+
+from app.core.config import settings
+from app.services.forecast import SERIES_COLS
+
+# planning reads at most the forecast history (56 days); keep a margin on top
+MIN_RETENTION_DAYS = 63
+CHUNK = 500
+ARCHIVE_COLS = ["id", "date"] + SERIES_COLS + ["units_sold"]
+
+
+def _month_dir(org_id: int, month: str) -> str:
+    return os.path.join(settings.ARCHIVE_DIR, f"org_{org_id}", month)
+
+
+def _db_bytes(db):
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return db.execute(text("SELECT pg_total_relation_size('sales') + pg_total_relation_size('sales_weekly')")).scalar()
+    if dialect == "sqlite":
+        return db.execute(text("PRAGMA page_count")).scalar() * db.execute(text("PRAGMA page_size")).scalar()
+    return None
+
+
+def _vacuum(db):
+    db.commit()
+    with db.bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM sales" if db.bind.dialect.name == "postgresql" else "VACUUM"))
+
+
+def _nulls(df: pd.DataFrame) -> pd.DataFrame:
+    # NaN -> None so NULL keys round-trip through CSV and go back to the database as NULL
+    return df.astype(object).where(df.notna(), None)
+
+
+def _weekly(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame.copy()
+    d = pd.to_datetime(frame["date"])
+    frame["week_start"] = (d - pd.to_timedelta(d.dt.weekday, unit="D")).dt.date
+    return (frame.groupby(["week_start"] + SERIES_COLS, dropna=False)
+            .agg(units_sold=("units_sold", "sum"), raw_rows=("units_sold", "size")).reset_index())
+
+
+def _apply_weekly(db, org_id: int, delta: pd.DataFrame, sign: int):
+    """Add (sign=1) or subtract (sign=-1) weekly totals. Caller commits."""
+    from app.models.inventory import SalesWeekly
+    cur = pd.read_sql(select(SalesWeekly.id, SalesWeekly.week_start, *[getattr(SalesWeekly, c) for c in SERIES_COLS],
+                             SalesWeekly.units_sold, SalesWeekly.raw_rows)
+                      .where(SalesWeekly.org_id == org_id,
+                             SalesWeekly.week_start.between(delta["week_start"].min(), delta["week_start"].max())),
+                      db.bind)
+    cur["week_start"] = pd.to_datetime(cur["week_start"]).dt.date
+    keys = ["week_start"] + SERIES_COLS
+    m = delta.merge(cur, on=keys, how="left", suffixes=("", "_cur"))
+    m[SERIES_COLS] = _nulls(m[SERIES_COLS])
+    new = m[m["id"].isna()]
+    old = m[m["id"].notna()]
+    if sign > 0 and len(new):
+        db.execute(insert(SalesWeekly), [
+            {"org_id": org_id, **{k: r[k] for k in keys}, "units_sold": int(r["units_sold"]),
+             "raw_rows": int(r["raw_rows"])} for r in new.to_dict(orient="records")])
+    if len(old):
+        units = old["units_sold_cur"] + sign * old["units_sold"]
+        rows = old["raw_rows_cur"] + sign * old["raw_rows"]
+        gone = old.loc[rows <= 0, "id"].astype("int64").tolist()
+        keep = old[rows > 0].assign(units_sold=units[rows > 0], raw_rows=rows[rows > 0])
+        if len(keep):
+            db.execute(update(SalesWeekly), [
+                {"id": int(r.id), "units_sold": int(r.units_sold), "raw_rows": int(r.raw_rows)}
+                for r in keep.itertuples(index=False)])
+        for i in range(0, len(gone), CHUNK):
+            db.execute(delete(SalesWeekly).where(SalesWeekly.id.in_(gone[i:i + CHUNK])))
+
+
+def _write_archive(frame: pd.DataFrame, path: str) -> int:
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", newline="") as fh:
+        frame[ARCHIVE_COLS].to_csv(fh, index=False)
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def compact_org(db, org_id: int, retention_days: int) -> dict:
+    from app.models.inventory import Sale, SalesWeekly
+    report = {"org_id": org_id, "rows": 0, "weekly_rows": 0, "months": [], "archive_bytes": 0, "raw_csv_bytes": 0}
+    last, first = db.execute(select(func.max(Sale.date), func.min(Sale.date)).where(Sale.org_id == org_id)).one()
+    if last is None:
+        return report
+    cutoff = last - timedelta(days=retention_days - 1)
+    cutoff -= timedelta(days=cutoff.weekday())
+    report["cutoff"] = cutoff.isoformat()
+
+    month = first.replace(day=1)
+    while month < cutoff:
+        nxt = (month + timedelta(days=32)).replace(day=1)
+        end = min(nxt, cutoff)
+        frame = pd.read_sql(select(*[getattr(Sale, c) for c in ARCHIVE_COLS])
+                            .where(Sale.org_id == org_id, Sale.date >= month, Sale.date < end)
+                            .order_by(Sale.id), db.bind)
+        if len(frame):
+            label = month.strftime("%Y-%m")
+            os.makedirs(_month_dir(org_id, label), exist_ok=True)
+            path = os.path.join(_month_dir(org_id, label),
+                                f"sales_{frame['date'].min()}_{frame['date'].max()}_{frame['id'].min()}.csv.gz")
+            # the archive is on disk before the rows go; a failed commit just leaves an extra file
+            size = _write_archive(frame, path)
+            weekly = _weekly(frame)
+            _apply_weekly(db, org_id, weekly, 1)
+            ids = frame["id"].astype("int64").tolist()
+            for i in range(0, len(ids), CHUNK):
+                db.execute(delete(Sale).where(Sale.id.in_(ids[i:i + CHUNK])))
+            db.commit()
+            report["rows"] += len(frame)
+            report["archive_bytes"] += size
+            report["raw_csv_bytes"] += len(frame[ARCHIVE_COLS].to_csv(index=False).encode())
+            report["months"].append(label)
+        month = nxt
+    # weeks straddling a month end are merged into one row, so count the table rather than the batches
+    report["weekly_rows"] = db.execute(select(func.count()).select_from(SalesWeekly)
+                                       .where(SalesWeekly.org_id == org_id)).scalar()
+    return report
+
+
+def compact(org_ids=None, retention_days: int | None = None, vacuum: bool = False) -> dict:
+    from app.db.session import SessionLocal
+    from app.models.user import Organization
+    from app.services.audit import audit_writer
+    from app.services.snapshots import refresh_snapshot
+
+    retention_days = retention_days or settings.SALES_RETENTION_DAYS
+    floor = max(MIN_RETENTION_DAYS, settings.MAX_LOOKBACK_DAYS)
+    if retention_days < floor:
+        raise SystemExit(f"retention must be at least {floor} days to cover planning windows "
+                         f"(forecast history and MAX_LOOKBACK_DAYS={settings.MAX_LOOKBACK_DAYS})")
+    db = SessionLocal()
+    before = _db_bytes(db)
+    orgs = org_ids or [o for (o,) in db.execute(select(Organization.id).order_by(Organization.id))]
+    results = []
+    for org_id in orgs:
+        r = compact_org(db, org_id, retention_days)
+        if r["rows"]:
+            refresh_snapshot(db, org_id)
+            audit_writer.record(org_id, None, "sales.compact",
+                                f"{r['rows']} rows before {r['cutoff']} archived and rolled up weekly")
+        results.append(r)
+        print(f"org {org_id}: {r['rows']} rows compacted ({r['weekly_rows']} weekly rows in total), "
+              f"archive {r['archive_bytes']} bytes ({', '.join(r['months']) or 'nothing to do'})")
+    if vacuum:
+        _vacuum(db)
+    after = _db_bytes(db)
+    db.close()
+    audit_writer.stop()
+    return {"retention_days": retention_days, "rows": sum(r["rows"] for r in results),
+            "archive_bytes": sum(r["archive_bytes"] for r in results),
+            "raw_csv_bytes": sum(r["raw_csv_bytes"] for r in results),
+            "db_bytes_before": before, "db_bytes_after": after,
+            "db_bytes_reclaimed": before - after if before is not None and after is not None else None,
+            "orgs": results}
+
+
+def restore(org_id: int, month: str) -> dict:
+    from app.db.session import SessionLocal
+    from app.models.inventory import Sale
+    from app.services.audit import audit_writer
+    from app.services.snapshots import refresh_snapshot
+
+    files = sorted(glob.glob(os.path.join(_month_dir(org_id, month), "sales_*.csv.gz")))
+    if not files:
+        raise SystemExit(f"no archives for org {org_id} in {month}")
+    db = SessionLocal()
+    rows = 0
+    for path in files:
+        frame = pd.read_csv(path, compression="gzip", dtype={c: str for c in SERIES_COLS})
+        frame[SERIES_COLS] = _nulls(frame[SERIES_COLS])
+        frame["date"] = pd.to_datetime(frame["date"]).dt.date
+        _apply_weekly(db, org_id, _weekly(frame), -1)
+        records = [{"org_id": org_id, **{c: r[c] for c in ["date"] + SERIES_COLS}, "units_sold": int(r["units_sold"])}
+                   for r in frame.to_dict(orient="records")]
+        for i in range(0, len(records), CHUNK):
+            db.execute(insert(Sale), records[i:i + CHUNK])
+        db.commit()
+        os.replace(path, path + ".restored")
+        rows += len(frame)
+        print(f"restored {len(frame)} rows from {os.path.basename(path)}")
+    refresh_snapshot(db, org_id)
+    db.close()
+    audit_writer.record(org_id, None, "sales.restore", f"{rows} rows from {month}")
+    audit_writer.stop()
+    return {"org_id": org_id, "month": month, "files": len(files), "rows": rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("compact", help="archive and roll up sales older than the retention horizon")
+    p.add_argument("--org", type=int, action="append", help="org id (repeatable; default: all)")
+    p.add_argument("--days", type=int, default=None, help="retention horizon (default SALES_RETENTION_DAYS)")
+    p.add_argument("--vacuum", action="store_true", help="VACUUM afterwards so the space is returned")
+    p = sub.add_parser("restore", help="re-import a month of archived sales")
+    p.add_argument("--org", type=int, required=True)
+    p.add_argument("--month", required=True, help="YYYY-MM")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        result = compact(args.org, args.days, args.vacuum)
+    else:
+        result = restore(args.org, args.month)
+    print(json.dumps({k: v for k, v in result.items() if k != "orgs"}, indent=2))
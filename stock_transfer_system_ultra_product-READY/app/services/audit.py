@@ -0,0 +1,115 @@
+import threading
+from datetime import datetime
+from sqlalchemy import insert
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models.audit import AuditLog
+
+AUDIT_EVENTS = registry.counter("audit_events_total", "Audit events by outcome", ("outcome",))
+AUDIT_BUFFER = registry.gauge("audit_buffer_depth", "Audit events waiting to be written")
+
+
+class AuditWriter:
+    """
+    Buffered audit trail.
+
+    record() only appends to an in-memory buffer, so request handlers never
+    wait on an INSERT. A background thread writes the buffer with one bulk
+    insert when `max_batch` events are waiting or every `interval` seconds,
+    and stop() writes whatever is left. Events keep the time they were
+    recorded, not the time they were flushed. A failed write is retried on
+    the next flush; past `max_buffer` waiting events new ones are dropped
+    and counted.
+    """
+
+    def __init__(self, max_batch=200, interval=2.0, max_buffer=10000):
+        self.max_batch, self.interval, self.max_buffer = max_batch, interval, max_buffer
+        self.buffer = []
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "failed": 0}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._halt = False
+        self._thread = None
+
+    def _count(self, outcome, n=1):
+        self.stats[outcome] += n
+        AUDIT_EVENTS.inc(n, outcome=outcome)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._halt = False
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Stop the worker and write everything still buffered."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._halt = True
+        self._wake.set()
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+    def record(self, org_id, user_email, action: str, detail: str = "") -> bool:
+        self.start()
+        event = {"org_id": org_id, "user_email": user_email, "action": action,
+                 "detail": detail, "created_at": datetime.utcnow()}
+        with self._lock:
+            if len(self.buffer) >= self.max_buffer:
+                self._count("dropped")
+                return False
+            self.buffer.append(event)
+            depth = len(self.buffer)
+            self._count("queued")
+        AUDIT_BUFFER.set(depth)
+        if depth >= self.max_batch:
+            self._wake.set()
+        return True
+
+    def flush(self) -> int:
+        """Write buffered events now; returns how many were written."""
+        from app.db.session import SessionLocal  # audit rows always go to the primary
+        with self._flush_lock:
+            with self._lock:
+                batch, self.buffer = self.buffer, []
+            if not batch:
+                return 0
+            db = SessionLocal()
+            try:
+                db.execute(insert(AuditLog), batch)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Audit Flush Error: {e}")
+                self._count("failed", len(batch))
+                with self._lock:
+                    # put them back in front of anything recorded meanwhile
+                    self.buffer = (batch + self.buffer)[-self.max_buffer:]
+                return 0
+            finally:
+                db.close()
+                AUDIT_BUFFER.set(len(self.buffer))
+            self._count("written", len(batch))
+            return len(batch)
+
+    def _run(self):
+        while not self._halt:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._halt:
+                self.flush()
+
+
+audit_writer = AuditWriter(
+    max_batch=settings.AUDIT_BATCH_SIZE,
+    interval=settings.AUDIT_FLUSH_SECONDS,
+    max_buffer=settings.AUDIT_BUFFER_MAX,
+)
+
+
+def audit(user, action: str, detail: str = ""):
+    """Record an action by a logged-in user; never blocks on the database."""
+    return audit_writer.record(user.org_id, user.email, action, detail)
@@ -0,0 +1,148 @@
+"""
+Content-addressed Excel export store.
+
+An export is named by a hash of the plan's saved content (TransferPlan.content_hash)
+and the parameters it was built with, so identical plans share one file. Each
+file has an ExportArtifact row with its size and last access; once the store
+exceeds EXPORT_DISK_BUDGET_MB the least recently used files are deleted.
+Files in EXPORTS_DIR without a row (e.g. the old Plan_<id>_<ts>.xlsx exports)
+count toward the budget too and are the first to go.
+Exports are built only from persisted plan rows, so an evicted file is simply
+rebuilt the next time it is downloaded.
+"""
+import hashlib, os, tempfile, time
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import registry, stage_timer
+from app.models.plan import TransferPlan, TransferItem, PlanKpi, ExportArtifact
+from app.services.planner import PLAN_COLS, KPI_COLS
+
+EXPORT_FORMAT = 1  # bump when the workbook layout changes
+EXPORTS = registry.counter("exports_total", "Export store lookups by outcome", ("outcome",))
+PARAM_COLS = ["lookback_days", "target_days_cover", "min_display", "pack_size",
+              "line_count", "total_units", "store_count"]
+# an untracked file younger than this may be an export whose row is not committed yet
+UNTRACKED_GRACE_SECONDS = 600
+TMP_PREFIX = ".tmp-"
+
+
+def export_key(plan: TransferPlan) -> str:
+    content = plan.content_hash or f"plan-{plan.id}"
+    params = "|".join(str(getattr(plan, c)) for c in PARAM_COLS)
+    return hashlib.sha256(f"{EXPORT_FORMAT}|{content}|{params}".encode()).hexdigest()
+
+
+def _write_workbook(db: Session, plan: TransferPlan, path: str):
+    items = pd.read_sql(db.query(TransferItem).filter(TransferItem.plan_id == plan.id)
+                        .order_by(TransferItem.id).statement, db.bind)[PLAN_COLS]
+    kpis = pd.read_sql(db.query(PlanKpi).filter(PlanKpi.plan_id == plan.id)
+                       .order_by(PlanKpi.id).statement, db.bind)[KPI_COLS]
+    pick = items.groupby(["from_store_id", "from_store", "sku", "style", "size"], as_index=False)["qty"].sum()
+    recv = items.groupby(["to_store_id", "to_store", "sku", "style", "size"], as_index=False)["qty"].sum()
+    params = pd.DataFrame([{c: getattr(plan, c) for c in PARAM_COLS}])
+
+    fd, tmp = tempfile.mkstemp(prefix=TMP_PREFIX, suffix=".xlsx", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        with pd.ExcelWriter(tmp, engine="openpyxl") as writer:
+            params.to_excel(writer, index=False, sheet_name="Plan")
+            items.to_excel(writer, index=False, sheet_name="Transfer Plan")
+            pick.to_excel(writer, index=False, sheet_name="Pick List")
+            recv.to_excel(writer, index=False, sheet_name="Receive List")
+            kpis.to_excel(writer, index=False, sheet_name="KPIs")
+        os.replace(tmp, path)
+    except Exception:
+        os.unlink(tmp)
+        raise
+
+
+def _untracked(db: Session):
+    """[(mtime, path, size)] of files in EXPORTS_DIR with no ExportArtifact row, oldest first."""
+    try:
+        entries = list(os.scandir(settings.EXPORTS_DIR))
+    except FileNotFoundError:
+        return []
+    known = {name for (name,) in db.query(ExportArtifact.filename)}
+    cutoff = time.time() - UNTRACKED_GRACE_SECONDS
+    out = []
+    for e in entries:
+        if e.name in known or e.name.startswith(TMP_PREFIX) or not e.is_file():
+            continue
+        st = e.stat()
+        if st.st_mtime < cutoff:
+            out.append((st.st_mtime, e.path, st.st_size))
+    return sorted(out)
+
+
+def evict(db: Session, keep_key: str | None = None) -> int:
+    """Delete untracked files, then LRU exports, until the store fits the budget. Returns files removed."""
+    budget = int(settings.EXPORT_DISK_BUDGET_MB * 1024 * 1024)
+    untracked = _untracked(db)
+    total = (db.query(func.coalesce(func.sum(ExportArtifact.size_bytes), 0)).scalar()
+             + sum(size for _, _, size in untracked))
+    removed = 0
+    if total <= budget:
+        return removed
+    for _, path, size in untracked:
+        if total <= budget:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    for art in db.query(ExportArtifact).order_by(ExportArtifact.last_accessed_at).all():
+        if total <= budget:
+            break
+        if art.content_key == keep_key:
+            continue
+        try:
+            os.unlink(os.path.join(settings.EXPORTS_DIR, art.filename))
+        except FileNotFoundError:
+            pass
+        total -= art.size_bytes or 0
+        db.delete(art)
+        removed += 1
+    db.commit()
+    EXPORTS.inc(removed, outcome="evicted")
+    return removed
+
+
+def get_export(db: Session, plan: TransferPlan) -> str:
+    """Path of the plan's export, building (or rebuilding an evicted) file when needed."""
+    key = export_key(plan)
+    filename = f"{key}.xlsx"
+    path = os.path.join(settings.EXPORTS_DIR, filename)
+    art = db.query(ExportArtifact).filter_by(content_key=key).first()
+    now = datetime.utcnow()
+
+    if art and os.path.exists(path):
+        art.last_accessed_at = now
+        db.commit()
+        EXPORTS.inc(outcome="hit")
+        return path
+
+    os.makedirs(settings.EXPORTS_DIR, exist_ok=True)
+    with stage_timer("excel"):
+        _write_workbook(db, plan, path)
+    size = os.path.getsize(path)
+    outcome = "rebuilt" if art else "built"
+    if art is None:
+        art = ExportArtifact(content_key=key, filename=filename, created_at=now)
+        db.add(art)
+    art.size_bytes, art.last_accessed_at = size, now
+    try:
+        db.commit()
+    except IntegrityError:
+        # another worker registered the same content first; the file is identical
+        db.rollback()
+    EXPORTS.inc(outcome=outcome)
+    evict(db, keep_key=key)
+    return path
@@ -0,0 +1,115 @@
+"""
+Batched demand forecasting: exponential smoothing with optional additive
+weekly seasonality, fitted for every (store, sku, style, size) series at once.
+
+Daily sales are laid out as a dense float32 matrix, series x day. The
+smoothing recursions step over days only; each step is one vector operation
+across all series, so cost grows with history length, not series count.
+`forecast_velocity` returns the same columns as `compute_velocity`, with
+avg_daily_sales set to the mean forecast over the horizon, so it drops
+straight into `plan_transfers`.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.core.metrics import current_org, registry
+
+FORECAST_WAPE = registry.gauge("forecast_backtest_wape", "Backtest WAPE of the latest forecast fit", ("org",))
+SERIES_COLS = ["store_id", "store_name", "sku", "style", "size"]
+SEASON = 7
+
+
+def build_matrix(sales: pd.DataFrame, history_days: int):
+    """(keys, Y, start) where Y[i, d] is units sold by series keys.iloc[i] on start + d days."""
+    dates = pd.to_datetime(sales["date"]).to_numpy("datetime64[D]")
+    end = dates.max()
+    # never pad before the first recorded sale: leading zeros would drag every level down
+    start = max(end - np.timedelta64(history_days - 1, "D"), dates.min())
+    history_days = int((end - start).astype(np.int64)) + 1
+    keep = dates >= start
+    sales, dates = sales[keep], dates[keep]
+
+    codes = sales.groupby(SERIES_COLS, sort=False, dropna=False).ngroup().to_numpy()
+    first = np.unique(codes, return_index=True)[1]  # first row of each code, in code order
+    keys = sales[SERIES_COLS].iloc[first].reset_index(drop=True)
+    day = (dates - start).astype(np.int64)
+    n = len(keys)
+    Y = np.bincount(codes * history_days + day, weights=sales["units_sold"].to_numpy(np.float64),
+                    minlength=n * history_days).astype(np.float32).reshape(n, history_days)
+    return keys, Y, pd.Timestamp(start)
+
+
+def fit(Y: np.ndarray, first_weekday: int, alpha: float = 0.1, gamma: float = 0.05, seasonal: bool = True):
+    """
+    Smooth every row of Y. Returns (level, seas): level is (S,), seas is (S, 7)
+    indexed by weekday (Mon=0), or None when seasonality is off or history is
+    shorter than two weeks.
+    """
+    n_days = Y.shape[1]
+    seasonal = seasonal and n_days >= 2 * SEASON
+    if not seasonal:
+        level = Y[:, 0].copy()
+        for t in range(1, n_days):
+            level += alpha * (Y[:, t] - level)
+        return level, None
+
+    # initial weekday profile: average deviation from the weekly mean over all whole weeks
+    weeks = Y[:, :n_days - n_days % SEASON].reshape(Y.shape[0], -1, SEASON)
+    profile = weeks.mean(axis=1)
+    level = profile.mean(axis=1)
+    seas = np.roll(profile - level[:, None], first_weekday, axis=1)
+    for t in range(n_days):
+        w = (first_weekday + t) % SEASON
+        y = Y[:, t]
+        level = alpha * (y - seas[:, w]) + (1 - alpha) * level
+        seas[:, w] = gamma * (y - level) + (1 - gamma) * seas[:, w]
+    return level, seas
+
+
+def predict(level, seas, next_weekday: int, horizon: int) -> np.ndarray:
+    """(S, horizon) daily forecasts, floored at zero."""
+    out = np.repeat(level[:, None], horizon, axis=1)
+    if seas is not None:
+        out += seas[:, (next_weekday + np.arange(horizon)) % SEASON]
+    return np.maximum(out, 0, out=out)
+
+
+def backtest(Y: np.ndarray, first_weekday: int, horizon: int, **params) -> dict:
+    """Fit on all but the last `horizon` days and score the forecast on them."""
+    if Y.shape[1] <= horizon:
+        return {"mae": None, "wape": None}
+    train, test = Y[:, :-horizon], Y[:, -horizon:]
+    level, seas = fit(train, first_weekday, **params)
+    err = np.abs(predict(level, seas, (first_weekday + train.shape[1]) % SEASON, horizon) - test)
+    actual = float(test.sum(dtype=np.float64))
+    return {"mae": float(err.mean(dtype=np.float64)),
+            "wape": float(err.sum(dtype=np.float64)) / actual if actual else None}
+
+
+def forecast_velocity(sales: pd.DataFrame, horizon: int = 7, history_days: int = 56,
+                      alpha: float = 0.1, gamma: float = 0.05, seasonal: bool = True, score: bool = True):
+    """
+    Forecast-based replacement for compute_velocity. Returns (velocity, report);
+    report has series, days, fit_seconds and backtest mae/wape over `horizon`.
+    """
+    cols = SERIES_COLS + ["avg_daily_sales"]
+    if sales.empty:
+        return pd.DataFrame(columns=cols), {"series": 0, "days": 0, "fit_seconds": 0.0, "mae": None, "wape": None}
+
+    keys, Y, start = build_matrix(sales, history_days)
+    params = {"alpha": alpha, "gamma": gamma, "seasonal": seasonal}
+    t0 = time.perf_counter()
+    level, seas = fit(Y, start.dayofweek, **params)
+    fit_seconds = time.perf_counter() - t0
+    fc = predict(level, seas, (start.dayofweek + Y.shape[1]) % SEASON, horizon)
+
+    velocity = keys.copy()
+    velocity["avg_daily_sales"] = fc.mean(axis=1, dtype=np.float64)
+    report = {"series": len(keys), "days": Y.shape[1], "fit_seconds": round(fit_seconds, 4),
+              "seasonal": seas is not None, "horizon": horizon}
+    report.update(backtest(Y, start.dayofweek, horizon, **params) if score else {"mae": None, "wape": None})
+    if report["wape"] is not None:
+        FORECAST_WAPE.set(report["wape"], org=current_org.get())
+    return velocity[cols], report
@@ -1,9 +1,119 @@
+import queue, threading, time
 import requests
+from requests.adapters import HTTPAdapter
 from app.core.config import settings
-def notify_slack(text: str):
-    if not settings.SLACK_WEBHOOK_URL: return False
-    try:
-        requests.post(settings.SLACK_WEBHOOK_URL, json={"text": text}, timeout=5)
+from app.core.metrics import registry
+
+NOTIFICATIONS = registry.counter("notifications_total", "Notification messages by outcome", ("outcome",))
+NOTIFY_QUEUE = registry.gauge("notification_queue_depth", "Messages waiting in the notification queue")
+
+_STOP = object()
+
+
+class NotificationDispatcher:
+    """
+    Background webhook sender.
+
+    notify() only enqueues, so request handlers never wait on the webhook.
+    A worker thread drains the queue over a pooled keep-alive session,
+    coalescing everything that arrives within `window` seconds into one
+    digest message and retrying failed posts with exponential backoff.
+    When the queue is full new messages are dropped and counted.
+    """
+
+    def __init__(self, url: str, max_queue=1000, window=2.0, max_batch=50, retries=3, backoff=0.5, timeout=5):
+        self.url = url
+        self.window, self.max_batch = window, max_batch
+        self.retries, self.backoff, self.timeout = retries, backoff, timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.stats = {"queued": 0, "sent": 0, "dropped": 0, "failed": 0, "retried": 0}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _count(self, outcome, n=1):
+        self.stats[outcome] += n
+        NOTIFICATIONS.inc(n, outcome=outcome)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="notify-dispatcher", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Flush what is queued and stop the worker."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self.queue.put(_STOP)  # blocking put: the stop marker must not be dropped
+        thread.join(timeout)
+
+    def notify(self, text: str) -> bool:
+        if not self.url:
+            return False
+        self.start()
+        try:
+            self.queue.put_nowait(text)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("queued")
+        NOTIFY_QUEUE.set(self.queue.qsize())
         return True
-    except Exception:
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self.queue.get()
+            if first is _STOP:
+                break
+            batch, deadline = [first], time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    msg = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if msg is _STOP:
+                    stopping = True
+                    break
+                batch.append(msg)
+            NOTIFY_QUEUE.set(self.queue.qsize())
+            self._send(batch)
+
+    def _send(self, batch):
+        text = batch[0] if len(batch) == 1 else f"{len(batch)} updates:\n" + "\n".join(f"• {t}" for t in batch)
+        for attempt in range(self.retries + 1):
+            try:
+                resp = self.session.post(self.url, json={"text": text}, timeout=self.timeout)
+                if resp.status_code < 400:
+                    self._count("sent", len(batch))
+                    return True
+                if resp.status_code != 429 and resp.status_code < 500:
+                    break  # client error, retrying will not help
+            except requests.RequestException:
+                pass
+            if attempt < self.retries:
+                self._count("retried")
+                time.sleep(self.backoff * (2 ** attempt))
+        self._count("failed", len(batch))
         return False
+
+
+dispatcher = NotificationDispatcher(
+    settings.SLACK_WEBHOOK_URL,
+    max_queue=settings.NOTIFY_QUEUE_SIZE,
+    window=settings.NOTIFY_COALESCE_SECONDS,
+    retries=settings.NOTIFY_MAX_RETRIES,
+)
+
+
+def notify_slack(text: str):
+    """Queue a Slack message; returns False if notifications are off or the queue is full."""
+    return dispatcher.notify(text)
@@ -0,0 +1,92 @@
+import hashlib
+import pandas as pd
+from sqlalchemy import insert, select, func, union_all
+from sqlalchemy.orm import Session
+
+from app.models.inventory import Rules
+from app.models.plan import TransferItem, PlanKpi, PlanGroup
+from app.services.planner import GROUP_COLS, PLAN_COLS, KPI_COLS
+
+
+def _records(df: pd.DataFrame, cols, plan_id: int):
+    # NaN -> None so nullable columns get NULL instead of a float NaN
+    out = df[cols].astype(object).where(df[cols].notna(), None).to_dict(orient="records")
+    for r in out:
+        r["plan_id"] = plan_id
+    return out
+
+
+def org_rules(db: Session, org_id: int) -> dict:
+    rules_obj = db.query(Rules).filter(Rules.org_id == org_id).first()
+    return {
+        "target_days_cover": rules_obj.target_days_cover if rules_obj else 7,
+        "min_display": rules_obj.min_display if rules_obj else 1,
+        "pack_size": rules_obj.pack_size if rules_obj else 1
+    }
+
+
+def save_plan_rows(db: Session, plan_id: int, plan_df: pd.DataFrame, kpi: pd.DataFrame, groups: pd.DataFrame):
+    """Bulk-insert a plan's lines, KPI rows and group digests. Caller commits."""
+    for model, df, cols in ((TransferItem, plan_df, PLAN_COLS),
+                            (PlanKpi, kpi, KPI_COLS),
+                            (PlanGroup, groups, GROUP_COLS + ["digest"])):
+        rows = _records(df, cols, plan_id)
+        if rows:
+            db.execute(insert(model), rows)
+
+
+def load_plan_rows(db: Session, plan_id: int):
+    """Return (groups, items, kpis) frames of a saved plan, as used for incremental replanning."""
+    groups = pd.read_sql(db.query(PlanGroup).filter(PlanGroup.plan_id == plan_id).statement, db.bind)
+    items = pd.read_sql(db.query(TransferItem).filter(TransferItem.plan_id == plan_id).statement, db.bind)
+    kpis = pd.read_sql(db.query(PlanKpi).filter(PlanKpi.plan_id == plan_id).statement, db.bind)
+    return groups, items, kpis
+
+
+def plan_summary(plan_df: pd.DataFrame) -> dict:
+    """Summary aggregates stored on TransferPlan when it is saved."""
+    stores = pd.concat([plan_df["from_store_id"], plan_df["to_store_id"]]).nunique()
+    return {"line_count": len(plan_df), "total_units": int(plan_df["qty"].sum()) if len(plan_df) else 0,
+            "store_count": int(stores)}
+
+
+def content_hash(plan_df: pd.DataFrame, kpi: pd.DataFrame) -> str:
+    """
+    Stable digest of a plan's lines and KPI rows. Rows are sorted first, so
+    the same content hashes the same whatever order the planner emitted it in
+    (incremental plans put reused groups before recomputed ones).
+    """
+    h = hashlib.sha256()
+    for df, cols in ((plan_df, PLAN_COLS), (kpi, KPI_COLS)):
+        h.update(str(len(df)).encode())
+        if len(df):
+            # sort as text: key columns may hold None, which does not order against str
+            rows = df[cols].astype(str).sort_values(cols, kind="stable")
+            h.update(pd.util.hash_pandas_object(rows, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def plan_summaries(db: Session, plans) -> dict:
+    """
+    {plan_id: summary} for the given TransferPlans. Stored aggregates are used
+    as-is; plans saved before they existed are aggregated in SQL.
+    """
+    out = {p.id: {"line_count": p.line_count, "total_units": p.total_units, "store_count": p.store_count}
+           for p in plans if p.line_count is not None}
+    missing = [p.id for p in plans if p.line_count is None]
+    if not missing:
+        return out
+    for plan_id, lines, units in db.execute(
+            select(TransferItem.plan_id, func.count(), func.coalesce(func.sum(TransferItem.qty), 0))
+            .where(TransferItem.plan_id.in_(missing)).group_by(TransferItem.plan_id)):
+        out[plan_id] = {"line_count": lines, "total_units": units, "store_count": 0}
+    ends = union_all(
+        select(TransferItem.plan_id, TransferItem.from_store_id.label("store")).where(TransferItem.plan_id.in_(missing)),
+        select(TransferItem.plan_id, TransferItem.to_store_id.label("store")).where(TransferItem.plan_id.in_(missing)),
+    ).subquery()
+    for plan_id, stores in db.execute(
+            select(ends.c.plan_id, func.count(func.distinct(ends.c.store))).group_by(ends.c.plan_id)):
+        out[plan_id]["store_count"] = stores
+    for plan_id in missing:
+        out.setdefault(plan_id, {"line_count": 0, "total_units": 0, "store_count": 0})
+    return out
@@ -1,4 +1,6 @@
+import time
 import pandas as pd, numpy as np
+from app.core.metrics import observe_stage
 
 def compute_velocity(sales: pd.DataFrame, lookback_days=7) -> pd.DataFrame:
     """
@@ -59,7 +61,8 @@ def plan_transfers(stock: pd.DataFrame, velocity: pd.DataFrame, stores: pd.DataF
     How many days the current inventory will last at current sales rate.
     Example: on_hand=21, velocity=3/day → days_cover = 7 days
     """
-    
+    t_match = time.perf_counter()
+
     # Merge stock with velocity and store priority
     df = (stock.merge(velocity, on=["store_id","store_name","sku","style","size"], how="left")
                .merge(stores, on=["store_id","store_name"], how="left"))
@@ -133,6 +136,9 @@ def plan_transfers(stock: pd.DataFrame, velocity: pd.DataFrame, stores: pd.DataF
                 sources.loc[sidx, "surplus"] -= ship_qty
                 need -= ship_qty
 
+    observe_stage("matching", t_match)
+    t_kpi = time.perf_counter()
+
     # Create transfer plan dataframe
     plan_df = pd.DataFrame(transfers)
     if plan_df.empty:
@@ -196,4 +202,72 @@ def plan_transfers(stock: pd.DataFrame, velocity: pd.DataFrame, stores: pd.DataF
         how="left"
     )
     
+    observe_stage("kpi", t_kpi)
     return plan_df, pick, recv, kpi
+
+
+GROUP_COLS = ["sku","style","size"]
+PLAN_COLS = ["from_store_id","from_store","to_store_id","to_store","sku","style","size","qty"]
+KPI_COLS = ["store_id","store_name","sku","style","size","avg_daily_sales",
+            "on_hand_before","on_hand_after","days_cover_before","days_cover_after"]
+
+
+def group_digests(stock: pd.DataFrame, velocity: pd.DataFrame, stores: pd.DataFrame, rules: dict) -> pd.DataFrame:
+    """
+    Fingerprint every (sku, style, size) group's planning inputs.
+
+    A group's digest covers the on-hand, velocity and store priority of each
+    store row in it plus the rules, i.e. everything plan_transfers reads for
+    that group. Equal digests mean plan_transfers would produce the same lines.
+    """
+    if stock.empty:
+        return pd.DataFrame(columns=GROUP_COLS + ["digest"])
+
+    df = (stock[["store_id","store_name","sku","style","size","on_hand"]]
+          .merge(velocity[["store_id","store_name","sku","style","size","avg_daily_sales"]],
+                 on=["store_id","store_name","sku","style","size"], how="left")
+          .merge(stores[["store_id","store_name","priority"]], on=["store_id","store_name"], how="left"))
+    df["avg_daily_sales"] = df["avg_daily_sales"].fillna(0.0).round(9)
+    df["priority"] = df["priority"].fillna(-1)
+    rules_key = "|".join(f"{k}={int(rules.get(k, 0))}" for k in ("target_days_cover","min_display","pack_size"))
+    df["rules"] = rules_key
+
+    # Row hashes are summed (mod 2**64) so the digest does not depend on row order
+    df["h"] = pd.util.hash_pandas_object(
+        df[["store_id","store_name","on_hand","avg_daily_sales","priority","rules"]].astype(str), index=False)
+    out = df.groupby(GROUP_COLS, dropna=False)["h"].agg(lambda h: np.uint64(h.to_numpy(np.uint64).sum())).reset_index()
+    out["digest"] = out["h"].map(lambda v: format(int(v), "016x"))
+    return out[GROUP_COLS + ["digest"]]
+
+
+def _concat(frames, cols):
+    frames = [f[cols] for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=cols)
+
+
+def plan_incremental(stock: pd.DataFrame, velocity: pd.DataFrame, stores: pd.DataFrame, rules: dict,
+                     base_groups: pd.DataFrame, base_items: pd.DataFrame, base_kpis: pd.DataFrame):
+    """
+    Re-plan only the groups whose inputs changed since a base plan.
+
+    Groups whose digest matches base_groups keep the base plan's transfer lines
+    and KPI rows; the rest go through plan_transfers. Returns the same frames
+    as plan_transfers plus the new group digests and reused/recomputed counts.
+    """
+    groups = group_digests(stock, velocity, stores, rules)
+    cmp = groups.merge(base_groups[GROUP_COLS + ["digest"]], on=GROUP_COLS, how="left", suffixes=("", "_base"))
+    same = cmp["digest"] == cmp["digest_base"]
+    unchanged, changed = cmp.loc[same, GROUP_COLS], cmp.loc[~same, GROUP_COLS]
+
+    if changed.empty:
+        plan_c = pd.DataFrame(columns=PLAN_COLS)
+        kpi_c = pd.DataFrame(columns=KPI_COLS)
+    else:
+        plan_c, _, _, kpi_c = plan_transfers(
+            stock.merge(changed, on=GROUP_COLS), velocity.merge(changed, on=GROUP_COLS), stores, rules)
+
+    plan_df = _concat([base_items.merge(unchanged, on=GROUP_COLS), plan_c], PLAN_COLS)
+    kpi = _concat([base_kpis.merge(unchanged, on=GROUP_COLS), kpi_c], KPI_COLS)
+    pick = plan_df.groupby(["from_store_id","from_store","sku","style","size"], as_index=False)["qty"].sum()
+    recv = plan_df.groupby(["to_store_id","to_store","sku","style","size"], as_index=False)["qty"].sum()
+    return plan_df, pick, recv, kpi, groups, len(unchanged), len(changed)
@@ -0,0 +1,188 @@
+"""
+Per-org columnar snapshots of the planner inputs.
+
+After each upload the org's stock, stores and daily sales are written as one
+.npy file per column under DATA_DIR/snapshots/org_<id>/v<version>/, with
+string keys stored as int32 codes into a shared dictionary.json. The planner
+opens them with np.load(mmap_mode="r"), so loads are cheap and the pages are
+shared between workers through the OS page cache.
+
+A snapshot is used only if its manifest matches SCHEMA_VERSION and the org's
+current DataVersion; otherwise callers fall back to SQL.
+"""
+import json, os, shutil, tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.inventory import DataVersion, Sale, Stock, Store
+
+SCHEMA_VERSION = 2
+KEY_COLS = ["store_id", "store_name", "sku", "style", "size"]
+TABLES = {
+    "stock": (KEY_COLS, ["on_hand"]),
+    "stores": (["store_id", "store_name"], ["priority"]),
+    "sales": (KEY_COLS, ["date", "units_sold"]),
+}
+
+
+def org_dir(org_id: int) -> str:
+    return os.path.join(settings.DATA_DIR, "snapshots", f"org_{org_id}")
+
+
+def current_version(db: Session, org_id: int) -> int:
+    return db.execute(select(DataVersion.version).where(DataVersion.org_id == org_id)).scalar() or 0
+
+
+def bump_version(db: Session, org_id: int) -> int:
+    """Mark the org's inputs as changed. Caller commits."""
+    res = db.execute(update(DataVersion).where(DataVersion.org_id == org_id)
+                     .values(version=DataVersion.version + 1))
+    if res.rowcount == 0:
+        db.add(DataVersion(org_id=org_id, version=1))
+        db.flush()
+    return current_version(db, org_id)
+
+
+def _read_inputs(db: Session, org_id: int):
+    stock = pd.read_sql(select(*[getattr(Stock, c) for c in KEY_COLS], Stock.on_hand)
+                        .where(Stock.org_id == org_id), db.bind)
+    stores = pd.read_sql(select(Store.store_id, Store.store_name, Store.priority)
+                         .where(Store.org_id == org_id), db.bind)
+    # daily totals are all compute_velocity needs, whatever the lookback
+    sales = pd.read_sql(select(*[getattr(Sale, c) for c in KEY_COLS], Sale.date,
+                               func.sum(Sale.units_sold).label("units_sold"))
+                        .where(Sale.org_id == org_id)
+                        .group_by(*[getattr(Sale, c) for c in KEY_COLS], Sale.date), db.bind)
+    return {"stock": stock, "stores": stores, "sales": sales}
+
+
+def write_snapshot(db: Session, org_id: int, version: int | None = None) -> str:
+    """Write the org's planner inputs for `version` (default: current) and make it current."""
+    version = current_version(db, org_id) if version is None else version
+    frames = _read_inputs(db, org_id)
+
+    # one dictionary per key column, shared by all tables so codes are joinable
+    dictionary = {}
+    for col in KEY_COLS:
+        values = pd.concat([f[col] for f in frames.values() if col in f], ignore_index=True)
+        codes, uniques = pd.factorize(values)
+        dictionary[col] = [str(u) for u in uniques]
+        offset = 0
+        for f in frames.values():
+            if col in f:
+                f[col] = codes[offset:offset + len(f)].astype(np.int32)
+                offset += len(f)
+
+    base = org_dir(org_id)
+    os.makedirs(base, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=base)
+    for table, (keys, values) in TABLES.items():
+        f = frames[table]
+        for col in keys:
+            np.save(os.path.join(tmp, f"{table}.{col}.npy"), f[col].to_numpy(np.int32))
+        for col in values:
+            if col == "date":
+                arr = pd.to_datetime(f[col]).to_numpy("datetime64[D]").astype(np.int64)
+            elif pd.api.types.is_integer_dtype(f[col]):
+                arr = f[col].to_numpy(np.int64)
+            else:
+                # a NULL makes read_sql return float64 with NaN; keep exactly that so
+                # group digests match whether inputs come from here or from SQL
+                arr = f[col].to_numpy(np.float64)
+            np.save(os.path.join(tmp, f"{table}.{col}.npy"), arr)
+    with open(os.path.join(tmp, "dictionary.json"), "w") as fh:
+        json.dump(dictionary, fh)
+    manifest = {"schema": SCHEMA_VERSION, "version": version, "created_at": datetime.utcnow().isoformat(),
+                "rows": {t: len(f) for t, f in frames.items()}}
+    with open(os.path.join(tmp, "manifest.json"), "w") as fh:
+        json.dump(manifest, fh)
+
+    target = os.path.join(base, f"v{version}")
+    shutil.rmtree(target, ignore_errors=True)
+    os.rename(tmp, target)
+    pointer = os.path.join(base, "CURRENT.tmp")
+    with open(pointer, "w") as fh:
+        fh.write(f"v{version}")
+    os.replace(pointer, os.path.join(base, "CURRENT"))
+
+    # keep the previous version for readers that are still mapping it
+    for name in os.listdir(base):
+        if name.startswith("v") and name[1:].isdigit() and int(name[1:]) < version - 1:
+            shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+    return target
+
+
+def build_snapshot(org_id: int, version: int):
+    """Write the snapshot for `version` in its own session; skipped once a newer upload has bumped it."""
+    from app.db.session import SessionLocal
+    db = SessionLocal()
+    try:
+        if current_version(db, org_id) == version:
+            write_snapshot(db, org_id, version)
+    except Exception as e:
+        # planner falls back to SQL for a missing snapshot
+        print(f"Snapshot Error (org {org_id}): {e}")
+    finally:
+        db.close()
+
+
+def refresh_snapshot(db: Session, org_id: int, background=None) -> int:
+    """
+    Call after an upload commits: bump the org's data version and rebuild its
+    snapshot. With `background` (FastAPI BackgroundTasks) the rebuild runs
+    after the response; until it lands the version check sends readers to SQL.
+    """
+    version = bump_version(db, org_id)
+    db.commit()
+    if settings.SNAPSHOTS_ENABLED:
+        if background is not None:
+            background.add_task(build_snapshot, org_id, version)
+        else:
+            build_snapshot(org_id, version)
+    return version
+
+
+def load_snapshot(org_id: int, version: int):
+    """Return {"stock", "stores", "sales"} DataFrames, or None if missing or stale."""
+    base = org_dir(org_id)
+    try:
+        with open(os.path.join(base, "CURRENT")) as fh:
+            path = os.path.join(base, fh.read().strip())
+        with open(os.path.join(path, "manifest.json")) as fh:
+            manifest = json.load(fh)
+        if manifest["schema"] != SCHEMA_VERSION or manifest["version"] != version:
+            return None
+        with open(os.path.join(path, "dictionary.json")) as fh:
+            dictionary = {c: np.array(v + [None], dtype=object) for c, v in json.load(fh).items()}
+
+        out = {}
+        for table, (keys, values) in TABLES.items():
+            cols = {}
+            for col in keys:
+                # code -1 (NULL) picks the trailing None
+                cols[col] = dictionary[col][np.load(os.path.join(path, f"{table}.{col}.npy"), mmap_mode="r")]
+            for col in values:
+                arr = np.load(os.path.join(path, f"{table}.{col}.npy"), mmap_mode="r")
+                cols[col] = arr.astype("datetime64[D]") if col == "date" else arr
+            out[table] = pd.DataFrame(cols)
+        return out
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load_planner_inputs(db: Session, org_id: int):
+    """
+    (sales, stock, stores, source) for the planner: from the snapshot when it
+    is current, otherwise straight from SQL.
+    """
+    if settings.SNAPSHOTS_ENABLED:
+        snap = load_snapshot(org_id, current_version(db, org_id))
+        if snap is not None:
+            return snap["sales"], snap["stock"], snap["stores"], "snapshot"
+    frames = _read_inputs(db, org_id)
+    return frames["sales"], frames["stock"], frames["stores"], "sql"
@@ -0,0 +1,92 @@
+"""
+Delta ingestion of full on-hand stock snapshots.
+
+Stores resend their whole on-hand several times a day and almost every row is
+unchanged, so instead of rewriting the table we diff the file against the
+org's current `stock` rows by (store_id, sku, style, size) and apply only the
+inserts, updates and deletes, as set-based statements in one transaction.
+A file byte-identical to the previous one is skipped without parsing.
+"""
+import hashlib, io
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.inventory import IngestFingerprint, Stock
+
+KEY_COLS = ["store_id", "sku", "style", "size"]
+REQUIRED = set(KEY_COLS) | {"on_hand"}
+TEXT_COLS = KEY_COLS + ["store_name"]
+DELETE_CHUNK = 500
+
+
+def read_snapshot_file(content: bytes, filename: str = "") -> pd.DataFrame:
+    # xlsx files are zip archives
+    if filename.lower().endswith((".xlsx", ".xlsm")) or content[:2] == b"PK":
+        xl = pd.ExcelFile(io.BytesIO(content), engine="openpyxl")
+        sheet = "Stock" if "Stock" in xl.sheet_names else xl.sheet_names[0]
+        return pd.read_excel(xl, sheet_name=sheet, engine="openpyxl", dtype={c: str for c in TEXT_COLS})
+    # keys stay text: no "001" -> 1 or "10" -> 10.0; on_hand is converted in _normalize
+    return pd.read_csv(io.BytesIO(content), dtype=str, keep_default_na=False)
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    if "store_name" not in df:
+        df["store_name"] = ""
+    for c in TEXT_COLS:
+        df[c] = df[c].fillna("").astype(str).str.strip()
+    df["on_hand"] = pd.to_numeric(df["on_hand"], errors="coerce").fillna(0).astype("int64")
+    df["row_hash"] = pd.util.hash_pandas_object(df[KEY_COLS + ["store_name", "on_hand"]], index=False)
+    return df
+
+
+def ingest_stock_snapshot(db: Session, org_id: int, content: bytes, filename: str = "") -> dict:
+    """Apply a stock snapshot file for the org; returns change counts. Commits."""
+    content_hash = hashlib.sha256(content).hexdigest()
+    fp = db.query(IngestFingerprint).filter_by(org_id=org_id, kind="stock").first()
+    if fp and fp.content_hash == content_hash:
+        return {"rows": fp.rows, "inserted": 0, "updated": 0, "deleted": 0, "unchanged": fp.rows, "skipped": True}
+
+    new = read_snapshot_file(content, filename)
+    missing = REQUIRED - set(new.columns)
+    if missing:
+        raise ValueError(f"Stock snapshot missing required columns: {', '.join(sorted(missing))}")
+    new = _normalize(new).drop_duplicates(KEY_COLS, keep="last")
+
+    cur = pd.read_sql(select(Stock.id, Stock.store_id, Stock.sku, Stock.style, Stock.size,
+                             Stock.store_name, Stock.on_hand).where(Stock.org_id == org_id), db.bind)
+    cur = _normalize(cur)
+    # the table has no unique key, so collapse duplicates: first id wins, the rest go
+    dup_ids = cur.loc[cur.duplicated(KEY_COLS, keep="first"), "id"].tolist()
+    cur = cur.drop_duplicates(KEY_COLS, keep="first")
+
+    m = new.merge(cur[KEY_COLS + ["id", "row_hash"]], on=KEY_COLS, how="outer",
+                  suffixes=("", "_cur"), indicator=True)
+    ins = m[m["_merge"] == "left_only"]
+    upd = m[(m["_merge"] == "both") & (m["row_hash"] != m["row_hash_cur"])]
+    del_ids = m.loc[m["_merge"] == "right_only", "id"].astype("int64").tolist() + dup_ids
+
+    if len(ins):
+        db.execute(insert(Stock), [
+            {"org_id": org_id, "store_id": r.store_id, "store_name": r.store_name, "sku": r.sku,
+             "style": r.style, "size": r.size, "on_hand": int(r.on_hand)}
+            for r in ins.itertuples(index=False)])
+    if len(upd):
+        # ORM bulk UPDATE by primary key: one executemany statement
+        db.execute(update(Stock), [
+            {"id": int(r.id), "store_name": r.store_name, "on_hand": int(r.on_hand)}
+            for r in upd.itertuples(index=False)])
+    for i in range(0, len(del_ids), DELETE_CHUNK):
+        db.execute(delete(Stock).where(Stock.id.in_(del_ids[i:i + DELETE_CHUNK])))
+
+    if fp is None:
+        fp = IngestFingerprint(org_id=org_id, kind="stock")
+        db.add(fp)
+    fp.content_hash, fp.rows, fp.created_at = content_hash, len(new), datetime.utcnow()
+    db.commit()
+    changed = len(ins) + len(upd)
+    return {"rows": len(new), "inserted": len(ins), "updated": len(upd), "deleted": len(del_ids),
+            "unchanged": len(new) - changed, "skipped": False}